@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import weakref
+from collections import deque
+
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from cache import cache
+from prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Upper bounds per model, the concurrency adapts below them when the API starts rate limiting
+MODEL_LIMITS = {
+    "gpt-4o-mini": {"max_concurrency": 16, "tokens_per_minute": 200_000},
+    "gpt-4o": {"max_concurrency": 8, "tokens_per_minute": 30_000},
+}
+DEFAULT_LIMITS = {"max_concurrency": 8, "tokens_per_minute": 100_000}
+
+# Rough size of a completion, counted against the tokens-per-minute budget with the prompt
+COMPLETION_TOKENS_ESTIMATE = 1000
+# Longest wait before a retry, whatever the Retry-After header asks for
+MAX_RETRY_DELAY = 60.0
+
+_client: AsyncOpenAI | None = None
+# The limiters wait on asyncio conditions, which are bound to an event loop: each loop has its own
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, ModelLimiter]]" = weakref.WeakKeyDictionary()
+
+
+class ModelLimiter:
+    """
+    Concurrency and tokens-per-minute limits of a model.
+    The concurrency limit is halved on every rate-limited call and grows back by one
+    after a full window of successful calls (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.in_flight = 0
+        self._successes = 0
+        self._window: deque[tuple[float, int]] = deque()
+        self._window_tokens = 0
+        self._condition = asyncio.Condition()
+
+    def _expire_window(self, now: float):
+        while self._window and now - self._window[0][0] >= 60:
+            self._window_tokens -= self._window.popleft()[1]
+
+    async def acquire(self, tokens: int):
+        async with self._condition:
+            while True:
+                now = time.monotonic()
+                self._expire_window(now)
+                fits_budget = not self._window or self._window_tokens + tokens <= self.tokens_per_minute
+                if self.in_flight < self.limit and fits_budget:
+                    break
+                # Wake up when the oldest call leaves the window, or when a call completes
+                timeout = 60 - (now - self._window[0][0]) if not fits_budget else None
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            self._window.append((now, tokens))
+            self._window_tokens += tokens
+
+    async def release(self, rate_limited: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                logger.info(f"Rate limited, lowering concurrency to {self.limit}")
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+def get_client() -> AsyncOpenAI:
+    """Returns the OpenAI client shared by every call."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI()
+    return _client
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    """Returns the limiter of a model for the running event loop."""
+    limiters = _limiters.setdefault(asyncio.get_running_loop(), {})
+    if model not in limiters:
+        limiters[model] = ModelLimiter(**MODEL_LIMITS.get(model, DEFAULT_LIMITS))
+    return limiters[model]
+
+
+def _cache_key(model: str, messages: list[dict], response_format: dict | None, params: dict) -> str:
+    """Key of a completion: model, messages with normalized whitespace, response schema and parameters."""
+    normalized = [{"role": m["role"], "content": " ".join(str(m["content"]).split())} for m in messages]
+    payload = json.dumps(
+        {"model": model, "messages": normalized, "response_format": response_format, "params": params},
+        sort_keys=True, default=str
+    )
+    return f"llm:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = math.nan
+    if math.isnan(delay) or delay < 0:
+        # No usable Retry-After header, exponential backoff with jitter
+        return min(30.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+    return min(delay, MAX_RETRY_DELAY)
+
+
+async def complete(
+        messages: list[dict],
+        model: str = DEFAULT_MODEL,
+        response_format: dict = None,
+        use_cache: bool = True,
+        cache_ttl: int = 7 * 24 * 3600,
+        max_retries: int = 5,
+        **params
+) -> str:
+    """
+    Sends a chat completion through the shared client and returns the content of the first choice.
+
+    Args:
+        messages (list[dict]): Chat messages
+        model (str): Model name
+        response_format (dict): Optional response format or JSON schema
+        use_cache (bool): Reuse the response of an identical request
+        cache_ttl (int): Lifetime of the cached response in seconds
+        max_retries (int): Retries on rate limits and transient API errors
+        **params: Any other parameter of the chat completions API
+
+    Raises:
+        openai.OpenAIError: When the request still fails after the retries
+    """
+    key = _cache_key(model, messages, response_format, params)
+    if use_cache and (content := cache.get(key)) is not None:
+        return content
+
+    if response_format is not None:
+        params["response_format"] = response_format
+    limiter = get_limiter(model)
+    tokens = sum(estimate_tokens(str(m["content"])) for m in messages) + COMPLETION_TOKENS_ESTIMATE
+
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(tokens)
+        rate_limited = False
+        try:
+            response = await get_client().chat.completions.create(model=model, messages=messages, **params)
+            content = response.choices[0].message.content
+            break
+        except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+            rate_limited = isinstance(e, RateLimitError)
+            if attempt == max_retries:
+                raise
+            delay = _retry_delay(attempt, e)
+            logger.info(f"{model} call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+        finally:
+            await limiter.release(rate_limited)
+        await asyncio.sleep(delay)
+
+    if use_cache and content is not None:
+        cache.set(key, content, expire=cache_ttl)
+    return content
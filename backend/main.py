@@ -1,16 +1,23 @@
 import asyncio
+import logging
+import os
 import uuid
+from contextlib import asynccontextmanager
 from typing import Dict
 
+import httpx
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from starlette import status
 
 from models import DomainRequest, StepSummaryRequest, JobResponse, JobStatus
+from providers.predictleads.client import PredictleadsClient
 from utils import get_gpt_summary
 from workflow import WebsiteAnalysisWorkflow
 
+logger = logging.getLogger(__name__)
+
 # In-memory job store
 jobs: Dict[str, JobStatus] = {}
 
@@ -18,7 +25,30 @@ jobs: Dict[str, JobStatus] = {}
 load_dotenv("../.env", override=True)
 load_dotenv()
 
-app = FastAPI(title="Data Driven VC API")
+
+async def warm_up_technologies():
+    """Loads the PredictLeads technology catalog, so that the analyses resolve technology ids from the store."""
+    try:
+        count = await PredictleadsClient().warm_up_technologies()
+    except httpx.HTTPError as e:
+        logger.warning(f"Failed to warm up the PredictLeads technologies: {e}")
+        return
+    if count:
+        logger.info(f"Loaded {count} PredictLeads technologies")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The catalog is loaded in the background, at most once per store TTL
+    warm_up = None
+    if os.getenv('PREDICTLEADS_API_TOKEN'):
+        warm_up = asyncio.create_task(warm_up_technologies())
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+
+
+app = FastAPI(title="Data Driven VC API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,116 @@
+import json
+import os
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text without a tokenizer:
+    words count for one token per 4 characters, punctuation for one token each.
+    """
+    if not text:
+        return 0
+    return sum((len(token) + 3) // 4 if token[0].isalnum() or token[0] == '_' else 1
+               for token in TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts a text so that it fits into `max_tokens`."""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ''
+    length = int(len(text) * max_tokens / tokens)
+    while length > 0 and estimate_tokens(text[:length]) > max_tokens:
+        length = int(length * 0.9)
+    return text[:length] + '…'
+
+
+def compact(data):
+    """Recursively drops the null and empty fields of a JSON-like structure."""
+    if isinstance(data, dict):
+        data = {k: compact(v) for k, v in data.items()}
+        return {k: v for k, v in data.items() if v not in (None, '', [], {})}
+    if isinstance(data, (list, tuple)):
+        data = [compact(v) for v in data]
+        return [v for v in data if v not in (None, '', [], {})]
+    return data
+
+
+def compact_json(data) -> str:
+    """Serializes data as JSON without indentation, whitespace or null fields."""
+    return json.dumps(compact(data), separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class PromptSection:
+    def __init__(self, title: str | None, items: list[str], priority: int, budget: int | None, min_tokens: int):
+        self.title = title
+        self.items = items
+        self.item_tokens = [estimate_tokens(item) for item in items]
+        self.header_tokens = estimate_tokens(f"### {title}:") if title else 0
+        self.priority = priority
+        self.min_tokens = min_tokens
+        if budget is not None:
+            self.shrink_to(budget)
+
+    @property
+    def text(self) -> str:
+        body = '\n'.join(self.items)
+        return f"### {self.title}:\n{body}\n\n" if self.title else f"{body}\n\n"
+
+    @property
+    def tokens(self) -> int:
+        return self.header_tokens + sum(self.item_tokens)
+
+    def shrink_to(self, max_tokens: int):
+        """Drops the last (lowest-value) items first, then truncates the last remaining one."""
+        max_tokens = max(max_tokens, self.min_tokens)
+        while len(self.items) > 1 and self.tokens > max_tokens:
+            self.items.pop()
+            self.item_tokens.pop()
+        if self.items and self.tokens > max_tokens:
+            self.items[-1] = truncate_to_tokens(self.items[-1], max_tokens - self.tokens + self.item_tokens[-1])
+            self.item_tokens[-1] = estimate_tokens(self.items[-1])
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt out of sections kept under a token ceiling.
+    When the sections do not fit, the lowest-priority ones are shrunk first, down to their `min_tokens`.
+    """
+
+    def __init__(self, max_tokens: int = None):
+        self.max_tokens = max_tokens or int(os.getenv('PROMPT_MAX_TOKENS', 24000))
+        self.sections: list[PromptSection] = []
+
+    def add_text(self, text: str, title: str = None, priority: int = 0, budget: int = None, min_tokens: int = 0):
+        if text:
+            self.sections.append(PromptSection(title, [text], priority, budget, min_tokens))
+        return self
+
+    def add_items(self, items: list, title: str = None, priority: int = 0, budget: int = None,
+                  item_budget: int = None, min_tokens: int = 0):
+        """
+        Adds a list section, items are expected by decreasing value.
+        Non-string items are serialized as compact JSON, one per line.
+        """
+        lines = [item if isinstance(item, str) else compact_json(item) for item in items]
+        if item_budget is not None:
+            lines = [truncate_to_tokens(line, item_budget) for line in lines]
+        lines = [line for line in lines if line]
+        if lines:
+            self.sections.append(PromptSection(title, lines, priority, budget, min_tokens))
+        return self
+
+    def build(self) -> str:
+        overflow = sum(section.tokens for section in self.sections) - self.max_tokens
+        for section in sorted(self.sections, key=lambda s: s.priority):
+            if overflow <= 0:
+                break
+            tokens = section.tokens
+            section.shrink_to(tokens - overflow)
+            overflow -= tokens - section.tokens
+        return ''.join(section.text for section in self.sections)
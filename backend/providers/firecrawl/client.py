@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class FirecrawlClient:
+    base_url = 'https://api.firecrawl.dev/v1'
+
+    def __init__(self, api_key: str = None):
+        self.headers = {
+            'Authorization': f"Bearer {api_key or os.getenv('FIRECRAWL_API_KEY')}",
+            'Content-Type': 'application/json'
+        }
+
+    async def start_crawl(self, client: httpx.AsyncClient, url: str, limit: int) -> str:
+        response = await client.post(
+            f'{self.base_url}/crawl',
+            headers=self.headers,
+            json={'url': url, 'limit': limit, 'scrapeOptions': {'formats': ['markdown']}}
+        )
+        response.raise_for_status()
+        return response.json()['id']
+
+    async def cancel_crawl(self, client: httpx.AsyncClient, crawl_id: str):
+        try:
+            response = await client.delete(f'{self.base_url}/crawl/{crawl_id}', headers=self.headers)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.info(f'Failed to cancel crawl {crawl_id}: {e}')
+
+    async def _iter_status_pages(self, client: httpx.AsyncClient, status: dict) -> AsyncIterator[dict]:
+        """Yields the pages of a crawl status, following the `next` links of large results."""
+        while True:
+            for page in status.get('data') or []:
+                yield page
+            next_url = status.get('next')
+            if not next_url:
+                return
+            response = await client.get(next_url, headers=self.headers)
+            response.raise_for_status()
+            status = response.json()
+
+    async def crawl(self, url: str, limit: int = 5, known_pages: dict[str, dict] = None, timeout: float = 60.0,
+                    initial_delay: float = 0.5, max_delay: float = 8.0) -> AsyncIterator[dict]:
+        """
+        Crawls a website and yields its pages as soon as Firecrawl reports them.
+
+        Args:
+            url (str): The website to crawl
+            limit (int): Maximum number of pages to crawl
+            known_pages (dict): Unused, Firecrawl does not support conditional requests
+            timeout (float): Overall deadline in seconds, the pages found so far are kept when it expires
+            initial_delay (float): First polling delay in seconds
+            max_delay (float): Upper bound of the exponential polling backoff
+
+        Yields:
+            dict: A page with its `url` and `markdown`
+        """
+        deadline = time.monotonic() + timeout
+        seen = set()
+        delay = initial_delay
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            crawl_id = await self.start_crawl(client, url, limit)
+            while True:
+                response = await client.get(f'{self.base_url}/crawl/{crawl_id}', headers=self.headers)
+                response.raise_for_status()
+                status = response.json()
+
+                new_pages = 0
+                async for page in self._iter_status_pages(client, status):
+                    source_url = (page.get('metadata') or {}).get('sourceURL')
+                    if not source_url or source_url in seen:
+                        continue
+                    seen.add(source_url)
+                    new_pages += 1
+                    yield {'url': source_url, 'markdown': page.get('markdown') or ''}
+
+                if status.get('status') == 'completed':
+                    return
+                if status.get('status') in ('failed', 'cancelled'):
+                    logger.info(f'Crawl {crawl_id} ended with status {status["status"]}')
+                    return
+
+                # Poll again quickly while pages keep coming, back off while the crawl is idle
+                delay = initial_delay if new_pages else min(delay * 2, max_delay)
+                if time.monotonic() + delay > deadline:
+                    logger.info(f'Crawl {crawl_id} exceeded its {timeout}s deadline, keeping {len(seen)} pages')
+                    await self.cancel_crawl(client, crawl_id)
+                    return
+                await asyncio.sleep(delay)
@@ -1,74 +1,182 @@
+import asyncio
 import os
-from pathlib import Path
-from string import Template
+import time
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import AsyncIterator
+from urllib.parse import parse_qs, urlparse
+
 import httpx
 
-from providers.github.utils import extract_nested_fields
+from providers.github.query_registry import queries
+from providers.github.response_store import ResponseStore
+from providers.github.user_store import UserStore
+from providers.github.utils import compile_mapper
+from providers.scheduler import get_scheduler
+
+REPO_FIELDS = compile_mapper({
+    "archived": "isArchived",
+    "created_at": "createdAt",
+    "default_branch": "defaultBranchRef.name",
+    "description": "description",
+    "fork": "isFork",
+    "forks_count": "forkCount",
+    "full_name": "nameWithOwner",
+    "has_issues": "hasIssuesEnabled",
+    "has_projects": "hasProjectsEnabled",
+    "has_wiki": "hasWikiEnabled",
+    "has_downloads": "latestRelease.id",
+    "homepage": "homepageUrl",
+    "language": "languages.edges.node.name",
+    "license_name": "licenseInfo.name",
+    "owner_node_id": "owner.id",
+    "owner_id": "owner.databaseId",
+    "owner_login": "owner.login",
+    "owner_type": "owner.__typename",
+    "pushed_at": "pushedAt",
+    "repo_id": "databaseId",
+    "mentionable_users": "mentionableUsers.totalCount",
+    "size": "diskUsage",
+    "stargazers_count": "stargazerCount",
+    "commits_count": "defaultBranchRef.target.history.totalCount",
+    "topics": "repositoryTopics.edges.node.topic.name",
+    "updated_at": "updatedAt",
+    "watchers_count": "watchers.totalCount",
+    "latest_commit_date": "defaultBranchRef.target.history.edges.node.committedDate",
+    "open_issues_count": "openIssues.totalCount",
+    "closed_issues_count": "closedIssues.totalCount",
+    "open_pull_requests_count": "openPullRequests.totalCount",
+    "closed_pull_requests_count": "closedPullRequests.totalCount",
+    "merged_pull_requests_count": "mergedPullRequests.totalCount",
+    "tags_count": "tags.totalCount"
+})
+
+REPO_STATS_FIELDS = compile_mapper({
+    "full_name": "nameWithOwner",
+    "created_at": "createdAt",
+    "pushed_at": "pushedAt",
+    "fork": "isFork",
+    "archived": "isArchived",
+    "stargazers_count": "stargazerCount",
+    "forks_count": "forkCount",
+    "mentionable_users": "mentionableUsers.totalCount",
+    "closed_issues_count": "closedIssues.totalCount",
+    "commits_count": "defaultBranchRef.target.history.totalCount",
+})
+
+USER_FIELDS = compile_mapper({
+    "user_id": 'databaseId',
+    "login": 'login',
+    "type": '__typename',
+    "name": 'name',
+    "company": 'company',
+    'blog': 'websiteUrl',
+    "location": 'location',
+    "email": 'email',
+    "hireable": 'isHireable',
+    "bio": 'bio',
+    "twitter_username": 'twitterUsername',
+    "public_repos": 'repositories.totalCount',
+    "public_gists": 'gists.totalCount',
+    'followers': 'followers.totalCount',
+    "following": 'following.totalCount',
+    "created_at": 'createdAt',
+    "updated_at": 'updatedAt',
+    "is_verified": "isVerified"
+})
+
+
+@lru_cache(maxsize=None)
+def repos_query(size: int) -> str:
+    """Query aliasing `size` repositories. Batches of the same size share the query text, only the variables change."""
+    variables = ', '.join(f'$owner{i}: String!, $name{i}: String!' for i in range(size))
+    fields = '\n'.join(f'  r{i}: repository(owner: $owner{i}, name: $name{i}) {{ ...RepoStatsFragment }}'
+                       for i in range(size))
+    return f'query Repos({variables}) {{\n{fields}\n}}\n\n' + queries.fragment('RepoStatsFragment')
+
+
+@lru_cache(maxsize=None)
+def users_query(size: int) -> str:
+    """Query aliasing `size` users or organizations."""
+    variables = ', '.join(f'$login{i}: String!' for i in range(size))
+    fields = '\n'.join(f'  u{i}: repositoryOwner(login: $login{i}) {{ ...UserFragment ...OrgFragment }}'
+                       for i in range(size))
+    return (f'query Users({variables}) {{\n{fields}\n}}\n\n'
+            + queries.fragment('UserFragment') + '\n\n' + queries.fragment('OrgFragment'))
 
 
 class GitHubClient:
     base_url = 'https://api.github.com/graphql'
+    rest_url = 'https://api.github.com'
+
+    # Last known rate limit of each resource ("core", "graphql", ...), shared by the clients of the process
+    rate_limits: dict[str, dict] = {}
 
-    def __init__(self, token: str = None):
+    def __init__(self, token: str = None, response_store: ResponseStore = None, user_store: UserStore = None):
         token = token or os.getenv('GITHUB_TOKEN')
+        self.scheduler = get_scheduler('github')
+        self.response_store = response_store or ResponseStore()
+        self.user_store = user_store or UserStore()
         self.headers = {
             "Authorization": f"token {token}"
         }
 
-    def get_query_from_file(self, filename: str) -> str:
-        with open(Path(__file__).resolve().parent / 'queries' / filename, 'r') as f:
-            return f.read()
+    def _track_rate_limit(self, response: httpx.Response):
+        """Records the X-RateLimit-* headers of the resource ("core", "graphql", ...) the request counted against."""
+        headers = response.headers
+        if 'x-ratelimit-remaining' not in headers:
+            return
+        resource = headers.get('x-ratelimit-resource', 'core')
+        rate_limit = {
+            'limit': int(headers.get('x-ratelimit-limit', 0)),
+            'remaining': int(headers['x-ratelimit-remaining']),
+            'reset': int(headers.get('x-ratelimit-reset', 0)),
+        }
+        self.rate_limits[resource] = rate_limit
+
+    async def _wait_for_rate_limit(self, resource: str):
+        """
+        Holds back a request until its resource is reset when the quota is used up. The resources have
+        separate quotas, so an exhausted REST quota does not stall the GraphQL requests and conversely.
+        """
+        rate_limit = self.headroom(resource)
+        if rate_limit and rate_limit['remaining'] == 0:
+            await asyncio.sleep(max(0.0, rate_limit['reset'] - time.time()))
+
+    def headroom(self, resource: str = 'core') -> dict | None:
+        """
+        Returns the remaining rate limit of a resource, as reported by the last response, so that batch runs
+        can pace themselves.
 
-    async def run_query(self, query: str) -> dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.base_url,
-                json={'query': query},
-                headers=self.headers
-            )
-            response.raise_for_status()
-            return response.json()
+        Args:
+            resource (str): "core" for the REST API, "graphql" for the GraphQL API
+
+        Returns:
+            dict | None: The `limit`, the `remaining` requests and the `reset` epoch time,
+                None before the first response
+        """
+        rate_limit = self.rate_limits.get(resource)
+        if rate_limit and rate_limit['reset'] <= time.time():
+            # The window was reset since the last response
+            return {**rate_limit, 'remaining': rate_limit['limit']}
+        return rate_limit
+
+    async def run_query(self, query: str, variables: dict = None) -> dict:
+        await self._wait_for_rate_limit('graphql')
+        response = await self.scheduler.post(
+            self.base_url,
+            json={'query': query, 'variables': variables or {}},
+            headers=self.headers
+        )
+        self._track_rate_limit(response)
+        response.raise_for_status()
+        return response.json()
 
     @staticmethod
     def _serialize_repo(raw_item: dict) -> dict:
-        mapper: dict[str, str] = {
-            "archived": "isArchived",
-            "created_at": "createdAt",
-            "default_branch": "defaultBranchRef.name",
-            "description": "description",
-            "fork": "isFork",
-            "forks_count": "forkCount",
-            "full_name": "nameWithOwner",
-            "has_issues": "hasIssuesEnabled",
-            "has_projects": "hasProjectsEnabled",
-            "has_wiki": "hasWikiEnabled",
-            "has_downloads": "latestRelease.id",
-            "homepage": "homepageUrl",
-            "language": "languages.edges.node.name",
-            "license_name": "licenseInfo.name",
-            "owner_node_id": "owner.id",
-            "owner_id": "owner.databaseId",
-            "owner_login": "owner.login",
-            "owner_type": "owner.__typename",
-            "pushed_at": "pushedAt",
-            "repo_id": "databaseId",
-            "mentionable_users": "mentionableUsers.totalCount",
-            "size": "diskUsage",
-            "stargazers_count": "stargazerCount",
-            "commits_count": "defaultBranchRef.target.history.totalCount",
-            "topics": "repositoryTopics.edges.node.topic.name",
-            "updated_at": "updatedAt",
-            "watchers_count": "watchers.totalCount",
-            "latest_commit_date": "defaultBranchRef.target.history.edges.node.committedDate",
-            "open_issues_count": "openIssues.totalCount",
-            "closed_issues_count": "closedIssues.totalCount",
-            "open_pull_requests_count": "openPullRequests.totalCount",
-            "closed_pull_requests_count": "closedPullRequests.totalCount",
-            "merged_pull_requests_count": "mergedPullRequests.totalCount",
-            "tags_count": "tags.totalCount"
-        }
         # Main mapping
-        item = extract_nested_fields(raw_item, mapper)
+        item = REPO_FIELDS(raw_item)
         # Topics: list to str
         topics = raw_item['repositoryTopics']['edges']
         if topics:
@@ -78,6 +186,16 @@ class GitHubClient:
         item['has_downloads'] = (item['has_downloads'] is not None) or (item['tags_count'] > 0)
         del item['tags_count']
         item['has_pages'] = item['homepage'] is not None
+        # Most recently closed issues, to measure the resolution time without another request,
+        # `iter_closed_issues` lists the next ones
+        recent_closed_issues = raw_item.get('recentClosedIssues') or {}
+        item['closed_issues'] = [
+            {'number': node['number'], 'created_at': node['createdAt'], 'closed_at': node['closedAt']}
+            for node in recent_closed_issues.get('nodes') or []
+        ]
+        item['has_more_closed_issues'] = bool((recent_closed_issues.get('pageInfo') or {}).get('hasNextPage'))
+        # GitHub's GraphQL API has no contributors count, mentionable users (contributors and collaborators) are the closest
+        item['contributors_count'] = item['mentionable_users']
 
         readme_keys = ['readme1', 'readme2', 'readme3']
         for key in readme_keys:
@@ -86,62 +204,232 @@ class GitHubClient:
                 break
         return item
 
+    @staticmethod
+    def _serialize_repo_stats(raw_item: dict) -> dict:
+        return REPO_STATS_FIELDS(raw_item)
+
     @staticmethod
     def _serialize_user(raw_item: dict):
-        mapper = {
-            "user_id": 'databaseId',
-            "login": 'login',
-            "type": '__typename',
-            "name": 'name',
-            "company": 'company',
-            'blog': 'websiteUrl',
-            "location": 'location',
-            "email": 'email',
-            "hireable": 'isHireable',
-            "bio": 'bio',
-            "twitter_username": 'twitterUsername',
-            "public_repos": 'repositories.totalCount',
-            "public_gists": 'gists.totalCount',
-            'followers': 'followers.totalCount',
-            "following": 'following.totalCount',
-            "created_at": 'createdAt',
-            "updated_at": 'updatedAt',
-            "is_verified": "isVerified"
-        }
-        return extract_nested_fields(raw_item, mapper)
+        item = USER_FIELDS(raw_item)
+        item['social_accounts'] = [edge['node']['url'] for edge in (raw_item.get('socialAccounts') or {}).get('edges') or []]
+        # Stars of the 5 most starred repositories owned by the user
+        item['top_repos_stars'] = sum(
+            edge['node']['stargazerCount'] for edge in (raw_item.get('repositories') or {}).get('edges') or [])
+        return item
 
     async def get_repo(self, owner: str, name: str):
-        query = Template(self.get_query_from_file("repo_by_name.graphql")).substitute(
-            owner=owner,
-            name=name
-        )
-        data = await self.run_query(query)
+        data = await self.run_query(queries.operation('repo_by_name'), {'owner': owner, 'name': name})
         return self._serialize_repo(data['data']['repository'])
 
-    async def get_user(self, username: str) -> dict:
-        query = Template(self.get_query_from_file("user_by_name.graphql")).substitute(
-            login=username
+    async def _get_users_batch(self, logins: list[str]) -> dict[str, dict]:
+        variables = {f'login{i}': login for i, login in enumerate(logins)}
+        data = await self.run_query(users_query(len(logins)), variables)
+        users = data.get('data') or {}
+        return {login: self._serialize_user(users[f'u{i}']) for i, login in enumerate(logins) if users.get(f'u{i}')}
+
+    async def get_users(self, logins: list[str], batch_size: int = 50) -> dict[str, dict]:
+        """
+        Fetches the profiles of many users or organizations, aliasing `batch_size` repositoryOwner fields
+        per GraphQL request. Profiles are cached by login, only the missing ones are requested.
+
+        Args:
+            logins (list[str]): GitHub logins
+            batch_size (int): Logins per request
+
+        Returns:
+            dict[str, dict]: The profiles by login, unknown logins are left out
+        """
+        logins = list(dict.fromkeys(logins))
+        users = {}
+        missing = []
+        for login in logins:
+            if (user := self.user_store.get(login)) is not None:
+                users[login] = user
+            else:
+                missing.append(login)
+        if missing:
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+            for batch in await asyncio.gather(*(self._get_users_batch(batch) for batch in batches)):
+                for login, user in batch.items():
+                    self.user_store.set(login, user)
+                    users[login] = user
+        return {login: users[login] for login in logins if login in users}
+
+    async def get_user(self, username: str) -> dict | None:
+        return (await self.get_users([username])).get(username)
+
+    async def _get_repos_batch(self, full_names: list[str]) -> list[dict]:
+        variables = {}
+        for i, full_name in enumerate(full_names):
+            variables[f'owner{i}'], variables[f'name{i}'] = full_name.split('/')
+        data = await self.run_query(repos_query(len(full_names)), variables)
+        # Missing repositories come back as null with an error, the others are still returned
+        repos = (data.get('data') or {}).values()
+        return [self._serialize_repo_stats(repo) for repo in repos if repo]
+
+    async def get_repos(self, full_names: list[str], batch_size: int = 25) -> list[dict]:
+        """
+        Fetches the activity stats of many repositories, aliasing `batch_size` repository fields per GraphQL request
+        and sending the requests concurrently.
+
+        Args:
+            full_names (list[str]): Repositories as "owner/name"
+            batch_size (int): Repositories per request
+
+        Returns:
+            list[dict]: The stats of the repositories that exist
+        """
+        batches = [full_names[i:i + batch_size] for i in range(0, len(full_names), batch_size)]
+        results = await asyncio.gather(*(self._get_repos_batch(batch) for batch in batches))
+        return [repo for batch in results for repo in batch]
+
+    async def list_owner_repos(self, owner: str, max_repos: int = 100) -> list[str]:
+        """Returns the full names of the public repositories of a user or organization, most recently pushed first."""
+        repos = []
+        async for page in self.paginate(f"users/{owner}/repos", {'type': 'owner', 'sort': 'pushed'},
+                                        max_pages=-(-max_repos // 100)):
+            repos += [repo['full_name'] for repo in page if not repo.get('fork')]
+        return repos[:max_repos]
+
+    async def scan_owner(self, owner: str, max_repos: int = 100, extra_repos: list[str] = None) -> list[dict]:
+        """
+        Fetches the stats of the public repositories of an owner in batched GraphQL requests.
+
+        Args:
+            owner (str): User or organization login
+            max_repos (int): Maximum number of repositories of the owner
+            extra_repos (list[str]): Other repositories to include, e.g. the ones listed by PredictLeads
+
+        Returns:
+            list[dict]: The stats of each repository
+        """
+        full_names = await self.list_owner_repos(owner, max_repos)
+        full_names = list(dict.fromkeys((extra_repos or []) + full_names))
+        return await self.get_repos(full_names)
+
+    async def _get_rest(self, url: str, params: dict = None) -> dict:
+        """
+        Sends a conditional GET revalidating the cached response, if any.
+
+        Returns:
+            dict: The JSON `body` and the `links` of the Link header
+        """
+        cached = self.response_store.get(url, params)
+        headers = dict(self.headers)
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        await self._wait_for_rate_limit('core')
+        response = await self.scheduler.get(url, params=params, headers=headers)
+        self._track_rate_limit(response)
+        if response.status_code == 304 and cached:
+            return cached
+        response.raise_for_status()
+        result = {
+            # Empty repositories answer 204 without a body
+            'body': response.json() if response.status_code != 204 else [],
+            'links': {rel: link['url'] for rel, link in response.links.items()},
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+        }
+        self.response_store.set(url, params, result)
+        return result
+
+    @staticmethod
+    def _last_page(response: dict) -> int:
+        last_url = response['links'].get('last')
+        if not last_url:
+            return 1
+        return int(parse_qs(urlparse(last_url).query).get('page', ['1'])[0])
+
+    async def paginate(self, path: str, params: dict = None, per_page: int = 100, max_pages: int = None,
+                       concurrency: int = 4) -> AsyncIterator[list[dict]]:
+        """
+        Yields the pages of a REST list endpoint in order.
+        The first response tells the number of pages (Link rel="last"), so the next pages are prefetched
+        `concurrency` at a time instead of following the rel="next" links one by one.
+
+        Args:
+            path (str): Path of the endpoint, e.g. `repos/{owner}/{repo}/issues`
+            params (dict): Query parameters
+            per_page (int): Items per page, at most 100
+            max_pages (int): Stop after that many pages
+            concurrency (int): Pages requested ahead of the one being consumed
+
+        Yields:
+            list[dict]: The items of each page
+        """
+        url = f"{self.rest_url}/{path.lstrip('/')}"
+        params = {**(params or {}), 'per_page': per_page}
+        first = await self._get_rest(url, {**params, 'page': 1})
+        yield first['body']
+
+        last_page = self._last_page(first)
+        if max_pages is not None:
+            last_page = min(last_page, max_pages)
+        next_pages = iter(range(2, last_page + 1))
+        pending = deque(
+            asyncio.create_task(self._get_rest(url, {**params, 'page': page}))
+            for page in islice(next_pages, concurrency)
         )
-        data = await self.run_query(query)
-        return self._serialize_user(data['data']['repositoryOwner'])
-
-    async def get_contributors(self, owner: str, repo: str) -> dict:
-        url = f"https://api.github.com/repos/{owner}/{repo}/contributors"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-
-    async def get_issues(self, owner: str, repo: str) -> list[dict]:
-        url = f"https://api.github.com/repos/{owner}/{repo}/issues?state=all"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        try:
+            while pending:
+                response = await pending.popleft()
+                for page in islice(next_pages, 1):
+                    pending.append(asyncio.create_task(self._get_rest(url, {**params, 'page': page})))
+                yield response['body']
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def count_contributors(self, owner: str, repo: str) -> int | None:
+        """
+        Counts the contributors of a repository in a single request: with one contributor per page,
+        the number of the last page is the number of contributors.
+
+        Returns:
+            int | None: The number of contributors, None when GitHub refuses to list them (very large repositories)
+        """
+        url = f"{self.rest_url}/repos/{owner}/{repo}/contributors"
+        try:
+            response = await self._get_rest(url, {'per_page': 1})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 403:
+                return None
+            raise
+        if 'last' in response['links']:
+            return self._last_page(response)
+        return len(response['body'])
+
+    async def get_top_contributors(self, owner: str, repo: str, top_n: int = 10) -> list[dict]:
+        """Returns the `login` and number of `contributions` of the main human contributors of a repository."""
+        response = await self._get_rest(f"{self.rest_url}/repos/{owner}/{repo}/contributors", {'per_page': top_n})
+        return [
+            {'login': contributor['login'], 'contributions': contributor['contributions']}
+            for contributor in response['body'] if contributor.get('type') == 'User'
+        ]
+
+    async def iter_closed_issues(self, owner: str, repo: str, max_pages: int = None) -> AsyncIterator[list[dict]]:
+        """
+        Yields the closed issues of a repository one page at a time, most recently updated first.
+        The pages are prefetched concurrently, pull requests (listed as issues by the REST API) are left out.
+
+        Args:
+            owner (str): Owner of the repository
+            repo (str): Name of the repository
+            max_pages (int): Stop after that many pages of 100 issues and pull requests
+
+        Yields:
+            list[dict]: Issues with their `number`, `created_at` and `closed_at` dates
+        """
+        params = {'state': 'closed', 'sort': 'updated', 'direction': 'desc'}
+        async for page in self.paginate(f"repos/{owner}/{repo}/issues", params, max_pages=max_pages):
+            yield [
+                {'number': issue['number'], 'created_at': issue['created_at'], 'closed_at': issue['closed_at']}
+                for issue in page if 'pull_request' not in issue
+            ]
 
     async def get_commits(self, owner: str, repo: str) -> list[dict]:
-        url = f"https://api.github.com/repos/{owner}/{repo}/commits"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self._get_rest(f"{self.rest_url}/repos/{owner}/{repo}/commits")
+        return response['body']
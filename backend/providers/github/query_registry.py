@@ -0,0 +1,75 @@
+import re
+from pathlib import Path
+
+QUERIES_DIR = Path(__file__).resolve().parent / 'queries'
+
+FRAGMENT_DEFINITION = re.compile(r'fragment\s+(\w+)\s+on\s+\w+')
+FRAGMENT_SPREAD = re.compile(r'\.\.\.\s*(?!on\b)(\w+)')
+VARIABLE_DEFINITION = re.compile(r'(\$\w+)\s*:')
+VARIABLE_USE = re.compile(r'\$\w+')
+
+
+class QueryRegistry:
+    """
+    GraphQL documents of the `queries` directory, loaded and checked once.
+    Operations are completed with the fragments they spread, so each one can be sent as is with its variables.
+    """
+
+    def __init__(self, directory: Path = QUERIES_DIR):
+        self.documents = {path.stem: path.read_text() for path in sorted(directory.glob('*.graphql'))}
+        self.fragments: dict[str, str] = {}
+        for name, document in self.documents.items():
+            self._validate(name, document)
+            for fragment in self._split_fragments(document):
+                self.fragments[FRAGMENT_DEFINITION.match(fragment).group(1)] = fragment
+        for name, document in self.documents.items():
+            for fragment_name in FRAGMENT_SPREAD.findall(document):
+                if fragment_name not in self.fragments:
+                    raise ValueError(f"{name}.graphql spreads the unknown fragment {fragment_name}")
+        self.operations = {
+            name: self._with_fragments(document) for name, document in self.documents.items()
+            if not document.lstrip().startswith('fragment')
+        }
+
+    @staticmethod
+    def _validate(name: str, document: str):
+        depth = 0
+        for char in document:
+            depth += {'{': 1, '}': -1}.get(char, 0)
+            if depth < 0:
+                break
+        if depth != 0:
+            raise ValueError(f"{name}.graphql has unbalanced braces")
+        operation = document.split('fragment ')[0]
+        defined = set(VARIABLE_DEFINITION.findall(operation))
+        used = set(VARIABLE_USE.findall(document)) - defined
+        if used:
+            raise ValueError(f"{name}.graphql uses undefined variables: {', '.join(sorted(used))}")
+
+    @staticmethod
+    def _split_fragments(document: str) -> list[str]:
+        starts = [match.start() for match in FRAGMENT_DEFINITION.finditer(document)]
+        return [document[start:end].strip() for start, end in zip(starts, starts[1:] + [len(document)])]
+
+    def _with_fragments(self, document: str) -> str:
+        """Appends the fragments spread by a document, and the ones they spread in turn, that it does not define."""
+        defined = {FRAGMENT_DEFINITION.match(f).group(1) for f in self._split_fragments(document)}
+        needed = []
+        pending = FRAGMENT_SPREAD.findall(document)
+        while pending:
+            fragment_name = pending.pop()
+            if fragment_name in defined or fragment_name in needed:
+                continue
+            needed.append(fragment_name)
+            pending += FRAGMENT_SPREAD.findall(self.fragments[fragment_name])
+        return '\n\n'.join([document.strip()] + [self.fragments[name] for name in needed])
+
+    def operation(self, name: str) -> str:
+        return self.operations[name]
+
+    def fragment(self, name: str) -> str:
+        """Returns a fragment followed by the fragments it spreads."""
+        return self._with_fragments(self.fragments[name])
+
+
+queries = QueryRegistry()
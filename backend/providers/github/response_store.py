@@ -0,0 +1,28 @@
+from urllib.parse import urlencode
+
+from cache import cache
+
+# Revalidated on every use, the TTL only bounds the size of the cache
+RESPONSE_TTL = 30 * 24 * 3600
+
+
+class ResponseStore:
+    """
+    Bodies of GitHub REST responses with their validators (ETag, Last-Modified) and Link header,
+    so that they can be revalidated with conditional requests. 304 responses do not count against the rate limit.
+    """
+
+    def __init__(self, ttl: int = RESPONSE_TTL):
+        self.ttl = ttl
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        query = urlencode(sorted((params or {}).items()))
+        return f"github_rest:{url}?{query}"
+
+    def get(self, url: str, params: dict = None) -> dict | None:
+        return cache.get(self.key(url, params))
+
+    def set(self, url: str, params: dict, response: dict):
+        if response.get('etag') or response.get('last_modified'):
+            cache.set(self.key(url, params), response, expire=self.ttl)
@@ -0,0 +1,22 @@
+from cache import cache
+
+# Profiles are shared by every repository a user contributed to
+USER_TTL = 7 * 24 * 3600
+
+
+class UserStore:
+    """GitHub user and organization profiles keyed by login."""
+
+    def __init__(self, ttl: int = USER_TTL):
+        self.ttl = ttl
+
+    @staticmethod
+    def key(login: str) -> str:
+        # Logins are case-insensitive
+        return f"github_user:{login.lower()}"
+
+    def get(self, login: str) -> dict | None:
+        return cache.get(self.key(login))
+
+    def set(self, login: str, user: dict):
+        cache.set(self.key(login), user, expire=self.ttl)
@@ -1,15 +1,51 @@
-from typing import Any
-from functools import reduce
+import re
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+LOGIN_PATTERN = re.compile(r'^[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})$')
+
+
+def compile_path(path: str) -> Callable[[Any], Any]:
+    """
+    Compiles a dotted path ("owner.login") into an accessor. Lists on the way are replaced by their first item,
+    missing fields give None.
+    """
+    keys = tuple(path.split('.'))
+
+    def extract(data):
+        for key in keys:
+            if isinstance(data, list):
+                data = data[0] if data else None
+            data = data.get(key) if data else None
+        return data
+
+    return extract
+
+
+def compile_mapper(paths: dict[str, str]) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    """Compiles a mapping of output fields to dotted paths into a function flattening a nested dict."""
+    accessors = [(key, compile_path(path)) for key, path in paths.items()]
+
+    def extract(data: dict[str, Any]) -> dict[str, Any]:
+        return {key: accessor(data) for key, accessor in accessors}
+
+    return extract
 
 
 def extract_nested_fields(data: dict[str, Any], paths: dict[str, Any]) -> dict[str, Any]:
     """
-    This method is used to map one nested dict to another linear dict
+    This method is used to map one nested dict to another linear dict.
+    Prefer `compile_mapper` when the same paths are applied many times.
     """
+    return compile_mapper(paths)(data)
 
-    def get_field(d, key):
-        if isinstance(d, list) and len(d) > 0:
-            return d[0].get(key) if d[0] else None
-        return d.get(key) if d else None
 
-    return {key: reduce(get_field, p.split('.'), data) for key, p in paths.items()}
+def login_from_url(url: str) -> str | None:
+    """Extracts the login of a GitHub profile URL, e.g. "https://github.com/torvalds" -> "torvalds"."""
+    if not url:
+        return None
+    parsed = urlparse(url if '://' in url else f'https://{url}')
+    if parsed.netloc.lower().removeprefix('www.') != 'github.com':
+        return None
+    login = parsed.path.strip('/').split('/')[0]
+    return login if LOGIN_PATTERN.match(login) else None
@@ -1 +1,2 @@
 from .client import HarmonicClient
+from .models import Company
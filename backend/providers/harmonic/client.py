@@ -1,64 +1,195 @@
+import asyncio
 import os
 from typing import List
 
-import httpx
-import numpy as np
-from sklearn.ensemble import IsolationForest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from quantitative.peer_scoring import PeerScorer
+from providers.harmonic.company_store import CompanyStore, CompetitorGraph
+from providers.harmonic.models import Company
+from providers.harmonic.person_store import PersonStore, project_person
+from providers.scheduler import get_scheduler
 
 
 class HarmonicClient:
     base_url: str = "https://api.harmonic.ai"
-
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, person_store: PersonStore = None, company_store: CompanyStore = None,
+                 competitor_graph: CompetitorGraph = None):
+        self.person_store = person_store or PersonStore()
+        self.company_store = company_store or CompanyStore()
+        self.competitor_graph = competitor_graph or CompetitorGraph()
+        # Shared by every client instance, so that concurrent steps and jobs stay under the API quota
+        self.scheduler = get_scheduler('harmonic')
         self.api_key = api_key or os.getenv("HARMONIC_API_KEY")
         self.headers = {
             "apikey": self.api_key,
             "Content-Type": "application/json"
         }
 
-    async def find_company(self, website_domain: str):
+    async def find_company(self, website_domain: str, raw: bool = False) -> Company:
+        """
+        Find a company by its website domain.
+        The full Harmonic payload is only kept, in `Company.raw`, when `raw` is set.
+        """
         url = f"{self.base_url}/companies"
         params = {"website_domain": website_domain}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        
-    async def get_company_from_urn(self, urn: str) -> dict:
+        response = await self.scheduler.post(url, headers=self.headers, params=params)
+        response.raise_for_status()
+        return Company.from_payload(response.json(), keep_raw=raw)
+
+    async def get_company_from_urn(self, urn: str, raw: bool = False) -> Company:
         url = f"{self.base_url}/companies/{urn}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self.scheduler.get(url, headers=self.headers)
+        response.raise_for_status()
+        return Company.from_payload(response.json(), keep_raw=raw)
 
     async def fetch_person(self, person_id: str):
         url = f"{self.base_url}/persons/{person_id}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
+        response = await self.scheduler.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _batch_get(self, resource: str, urns: List[str], batch_size: int = 50,
+                         max_concurrency: int = 10) -> dict[str, dict]:
+        """
+        Fetches raw payloads keyed by URN with Harmonic's `batchGet` endpoint of a resource
+        ('companies' or 'persons'), `batch_size` URNs per request.
+        URNs the batch endpoint does not return are fetched one by one, concurrently.
+        """
+        urns = list(dict.fromkeys(urns))
+        results: dict[str, dict] = {}
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get_batch(batch):
+            async with semaphore:
+                response = await self.scheduler.post(
+                    f"{self.base_url}/{resource}/batchGet", headers=self.headers, json={"urns": batch}
+                )
+            if response.status_code in (404, 405, 501):
+                # No batch lookup for this resource, everything falls back to single lookups
+                return
+            response.raise_for_status()
+            for item in response.json():
+                if item and item.get('entity_urn') in batch:
+                    results[item['entity_urn']] = item
+
+        async def get_one(urn):
+            async with semaphore:
+                response = await self.scheduler.get(f"{self.base_url}/{resource}/{urn}", headers=self.headers)
             response.raise_for_status()
-            return response.json()
+            results[urn] = response.json()
+
+        await asyncio.gather(*(get_batch(urns[i:i + batch_size]) for i in range(0, len(urns), batch_size)))
+        await asyncio.gather(*(get_one(urn) for urn in urns if urn not in results))
+        return results
+
+    async def get_companies_by_urns(self, urns: List[str], raw: bool = False) -> dict[str, Company]:
+        """Fetches several companies in batches, keyed by URN."""
+        payloads = await self._batch_get("companies", urns)
+        return {urn: Company.from_payload(payload, keep_raw=raw) for urn, payload in payloads.items()}
+
+    async def fetch_people_by_urns(self, urns: List[str]) -> dict[str, dict]:
+        """Fetches several raw person payloads in batches, keyed by URN."""
+        return await self._batch_get("persons", urns)
+
+    async def get_person(self, urn: str) -> dict:
+        """Returns the compact profile of a person, read through the person store."""
+        return (await self.get_people([urn]))[0]
+
+    async def get_people(self, urns: List[str]) -> List[dict]:
+        """
+        Returns the compact profiles of several people, in the order of `urns`.
+        Only the people missing from the person store are fetched, in batches.
+        """
+        people = {urn: self.person_store.get(urn) for urn in urns}
+        missing = [urn for urn, person in people.items() if person is None]
+        if missing:
+            for urn, payload in (await self.fetch_people_by_urns(missing)).items():
+                person = project_person(payload)
+                person['entity_urn'] = person['entity_urn'] or urn
+                self.person_store.set(urn, person)
+                people[urn] = person
+        return [people[urn] for urn in urns]
 
     async def find_employees_experience(self, website_domain: str) -> list[dict]:
         company_data = await self.find_company(website_domain)
         if not company_data:
             return []
 
-        person_ids = [p['person'] for p in company_data['people']]
-        people_data = []
-        for person_id in person_ids:
-            person_data = await self.fetch_person(person_id)
-            people_data.append(person_data)
-        return people_data
+        person_ids = [p['person'] for p in company_data['people'] if p.get('person')]
+        return await self.get_people(person_ids)
+
+    async def get_company(self, urn: str) -> Company:
+        """Returns the projection of a company, read through the company store."""
+        return (await self.get_companies([urn]))[0]
+
+    async def get_companies(self, urns: List[str]) -> List[Company]:
+        """
+        Returns the projections of several companies, in the order of `urns`.
+        Only the companies missing from the company store are fetched, in batches.
+        """
+        companies = {urn: self.company_store.get(urn) for urn in urns}
+        missing = [urn for urn, company in companies.items() if company is None]
+        if missing:
+            for urn, company in (await self.get_companies_by_urns(missing)).items():
+                self.company_store.set(urn, company)
+                companies[urn] = company
+        return [companies[urn] for urn in urns]
+
+    async def find_similar_urns(self, company_urn: str) -> List[str]:
+        endpoint = f"{self.base_url}/search/similar_companies/{company_urn}"
+        response = await self.scheduler.get(endpoint, headers=self.headers)
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+    @staticmethod
+    def rank_by_similarity(company: Company, candidates: List[Company]) -> List[float]:
+        """Cosine similarity between the description and tags of a company and each candidate."""
+        def document(c):
+            # Harmonic sends null descriptions and tag values
+            tags = ' '.join(tag.get('display_value') or '' for tag in (c.get('tags_v2') or []) + (c.get('tags') or []))
+            return f"{c.get('description') or ''} {tags}"
+
+        try:
+            tfidf = TfidfVectorizer(stop_words='english').fit_transform([document(company)] + [document(c) for c in candidates])
+        except ValueError:
+            # Empty vocabulary, nothing to rank on
+            return [0.0] * len(candidates)
+        return (tfidf[1:] @ tfidf[0].T).toarray().ravel().tolist()
 
-    async def get_competitors(self, website_domain: str) -> List[dict]:
+    async def rank_neighbors(self, company: Company, urns: List[str], top_k: int) -> list[tuple[str, float | None]]:
         """
-        Get a list of similar companies (competitors) for a given domain.
+        Ranks the similar companies of `company` in two stages, fetching at most `top_k` companies.
+
+        The shortlist is made of the candidates already in the company store, which cost nothing,
+        and of the first `top_k` missing ones in Harmonic's own order. Only the missing shortlisted
+        companies are fetched, then the shortlist is ranked locally by description/tag similarity.
+        The candidates left out follow, unscored, in Harmonic's order.
+        """
+        urns = list(dict.fromkeys(urns))
+        missing = [urn for urn in urns if self.company_store.get(urn) is None]
+        left_out = set(missing[top_k:])
+        shortlist = [urn for urn in urns if urn not in left_out]
+        candidates = await self.get_companies(shortlist)
+        scores = self.rank_by_similarity(company, candidates)
+        # Stable sort: Harmonic's own order breaks the ties
+        ranked = sorted(zip(shortlist, scores), key=lambda neighbor: -neighbor[1])
+        return ranked + [(urn, None) for urn in urns if urn in left_out]
+
+    async def get_competitors(self, website_domain: str, top_k: int = 10) -> List[Company]:
+        """
+        Get the most similar companies (competitors) for a given domain.
+
+        The candidates returned by Harmonic are ranked by `rank_neighbors`, which only fetches the companies
+        it needs, and the top `top_k` are returned.
+        The ranked neighbors are kept in the competitor graph for later analyses.
         
         Args:
             website_domain (str): The domain name of the company (e.g., 'example.com')
+            top_k (int): Number of competitors to return
             
         Returns:
-            List[str]: A list of URNs for similar companies
+            List[Company]: The similar companies, most similar first
             
         Raises:
             httpx.HTTPError: If the API request fails
@@ -72,21 +203,13 @@ class HarmonicClient:
         if not company_urn:
             return []
 
-        # Use the URN to get similar companies
-        endpoint = f"{self.base_url}/search/similar_companies/{company_urn}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(endpoint, headers=self.headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            urns = data.get("results", [])
-            
-            companies = []
-            for urn in urns:
-                company = await self.get_company_from_urn(urn)
-                companies.append(company)
-            return companies
+        neighbors = self.competitor_graph.neighbors(company_urn)
+        if neighbors is None:
+            urns = await self.find_similar_urns(company_urn)
+            neighbors = await self.rank_neighbors(company_data, urns, top_k)
+            self.competitor_graph.set_neighbors(company_urn, neighbors)
+
+        return await self.get_companies([urn for urn, _ in neighbors[:top_k]])
         
     def format_companies_to_md(self, companies: List[dict]) -> str:
         """
@@ -137,104 +260,8 @@ class HarmonicClient:
                 - List of companies identified as outliers
                 - Dictionary of feature importance metrics
         """
-        # Combine myself with others into one list
-        all_companies = [myself] + others
-        
-        # Define features to analyze
-        feature_names = [
-            'headcount',
-            'funding_rounds_count',
-            'total_funding',
-            'last_funding',
-            'stage_score'
-        ]
-        
-        # Stage scoring mapping
-        stage_scores = {
-            'SEED': 1,
-            'SERIES_A': 2,
-            'SERIES_B': 3,
-            'SERIES_C': 4,
-            'SERIES_D': 5,
-            'SERIES_E': 6,
-            'IPO': 7,
-            'ACQUIRED': 8,
-            'UNKNOWN': 0
-        }
-        
-        # Extract numeric features for comparison
-        features = []
-        for company in all_companies:
-            company_features = []
-            
-            # Headcount
-            headcount = float(company.get('headcount', 0))
-            company_features.append(headcount)
-            
-            # Number of funding rounds
-            funding_rounds = len(company.get('funding_rounds', []))
-            company_features.append(float(funding_rounds))
-            
-            # Total funding amount
-            total_funding = sum(
-                round.get('amount', 0) 
-                for round in company.get('funding_rounds', [])
-            )
-            company_features.append(float(total_funding))
-            
-            # Last funding amount (most recent round)
-            last_funding = (
-                company.get('funding_rounds', [])[-1].get('amount', 0)
-                if company.get('funding_rounds')
-                else 0
-            )
-            company_features.append(float(last_funding))
-            
-            # Stage score
-            stage = company.get('stage', 'UNKNOWN')
-            stage_score = stage_scores.get(stage, 0)
-            company_features.append(float(stage_score))
-            
-            features.append(company_features)
-            
-        features = np.array(features)
-        
-        # Skip if not enough data points
-        if len(features) < 2:
-            return [], {}
-            
-        # Fit isolation forest
-        iso_forest = IsolationForest(contamination=contamination, random_state=42)
-        iso_forest.fit(features)
-        outliers = iso_forest.predict(features)
-        
-        # Calculate feature importance using decision paths
-        feature_importance = {}
-        
-        # For each feature, calculate its importance based on how often it's used in decision paths
-        for idx, feature_name in enumerate(feature_names):
-            # Calculate how often this feature is used in decision paths
-            feature_usage = np.sum([
-                1 for estimator in iso_forest.estimators_
-                if idx in estimator.tree_.feature
-            ])
-            feature_importance[feature_name] = feature_usage / len(iso_forest.estimators_)
-        
-        # Normalize feature importance
-        total_importance = sum(feature_importance.values())
-        if total_importance > 0:
-            feature_importance = {
-                k: round(v / total_importance * 100, 2)
-                for k, v in feature_importance.items()
-            }
-        
-        # Return companies marked as outliers (-1) and feature importance
-        outlier_companies = []
-        for idx, is_outlier in enumerate(outliers):
-            if is_outlier == -1:
-                outlier_companies.append(all_companies[idx])
-                
-        return outlier_companies, feature_importance
+        scorer = PeerScorer([myself] + others)
+        return scorer.outliers(contamination), scorer.feature_importance()
     
     async def get_founders_from_company(self, company):
         if 'people' not in company:
@@ -243,7 +270,7 @@ class HarmonicClient:
         people = company['people']
         founder_urns = [person['person'] for person in people if 'role_type' in person and 'person' in person and person['role_type'] == 'FOUNDER']
 
-        return [await self.fetch_person(urn) for urn in founder_urns]
+        return await self.get_people(founder_urns)
 
     def format_founders_to_md(self, founders: List[dict], founders_backgrounds: List[dict]) -> str:
         """
@@ -0,0 +1,37 @@
+from cache import cache
+from providers.harmonic.models import Company
+
+# Company projections and their neighborhoods are refreshed weekly
+COMPANY_TTL = 7 * 24 * 3600
+
+
+class CompanyStore:
+    """Compact company projections keyed by company URN, shared across analyses."""
+
+    def __init__(self, ttl: int = COMPANY_TTL):
+        self.ttl = ttl
+
+    def get(self, urn: str) -> Company | None:
+        return cache.get(f"harmonic_company:{urn}")
+
+    def set(self, urn: str, company: Company):
+        # Raw payloads are never persisted
+        if company.raw is not None:
+            company = Company(**company.to_dict())
+        cache.set(f"harmonic_company:{urn}", company, expire=self.ttl)
+
+
+class CompetitorGraph:
+    """
+    Similar-company edges keyed by company URN, each neighbor with its similarity score,
+    so that the neighbors of a company are resolved and ranked once across related analyses.
+    """
+
+    def __init__(self, ttl: int = COMPANY_TTL):
+        self.ttl = ttl
+
+    def neighbors(self, urn: str) -> list[tuple[str, float | None]] | None:
+        return cache.get(f"harmonic_competitors:{urn}")
+
+    def set_neighbors(self, urn: str, neighbors: list[tuple[str, float | None]]):
+        cache.set(f"harmonic_competitors:{urn}", neighbors, expire=self.ttl)
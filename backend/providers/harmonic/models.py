@@ -0,0 +1,75 @@
+COMPANY_FIELDS = (
+    'entity_urn', 'name', 'description', 'stage', 'headcount', 'customer_type',
+    'funding_rounds', 'tags', 'tags_v2', 'people'
+)
+FUNDING_ROUND_FIELDS = ('amount', 'funding_round_type', 'announcement_date')
+TAG_FIELDS = ('type', 'display_value')
+PEOPLE_FIELDS = ('person', 'role_type', 'title', 'is_current_position')
+
+
+def _project_items(items: list | None, fields: tuple) -> list[dict] | None:
+    if items is None:
+        return None
+    return [{field: item.get(field) for field in fields if field in item} for item in items]
+
+
+class Company:
+    """
+    Compact projection of a Harmonic company payload, keeping only the fields used by the analysis.
+    It supports read-only dict-style access (`get`, `[]`, `in`) so it can be used wherever the raw payload was;
+    fields missing from the payload, or null, behave as absent keys.
+    """
+    __slots__ = COMPANY_FIELDS + ('raw',)
+
+    def __init__(self, entity_urn: str = None, name: str = None, description: str = None, stage: str = None,
+                 headcount: int = None, customer_type: str = None, funding_rounds: list[dict] = None,
+                 tags: list[dict] = None, tags_v2: list[dict] = None, people: list[dict] = None, raw: dict = None):
+        self.entity_urn = entity_urn
+        self.name = name
+        self.description = description
+        self.stage = stage
+        self.headcount = headcount
+        self.customer_type = customer_type
+        self.funding_rounds = funding_rounds
+        self.tags = tags
+        self.tags_v2 = tags_v2
+        self.people = people
+        self.raw = raw
+
+    @classmethod
+    def from_payload(cls, payload: dict, keep_raw: bool = False) -> 'Company':
+        return cls(
+            entity_urn=payload.get('entity_urn'),
+            name=payload.get('name'),
+            description=payload.get('description'),
+            stage=payload.get('stage'),
+            headcount=payload.get('headcount'),
+            customer_type=payload.get('customer_type'),
+            funding_rounds=_project_items(payload.get('funding_rounds'), FUNDING_ROUND_FIELDS),
+            tags=_project_items(payload.get('tags'), TAG_FIELDS),
+            tags_v2=_project_items(payload.get('tags_v2'), TAG_FIELDS),
+            people=_project_items(payload.get('people'), PEOPLE_FIELDS),
+            raw=payload if keep_raw else None,
+        )
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in COMPANY_FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        # Like the raw payload, known fields may be null
+        if key not in COMPANY_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __bool__(self) -> bool:
+        return self.entity_urn is not None or self.name is not None
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in COMPANY_FIELDS}
+
+    def __repr__(self):
+        return f"Company(entity_urn={self.entity_urn!r}, name={self.name!r})"
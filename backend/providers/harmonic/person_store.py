@@ -0,0 +1,49 @@
+from cache import cache
+
+# People profiles change slowly and are shared by every company they are related to
+PERSON_TTL = 90 * 24 * 3600
+
+# Bump whenever `project_person` keeps new fields, so that older projections are not reused
+PERSON_PROJECTION_VERSION = 2
+
+EXPERIENCE_FIELDS = [
+    'title', 'department', 'description', 'role_type', 'company_name',
+    'start_date', 'end_date', 'is_current_position'
+]
+EDUCATION_FIELDS = ['degree', 'field', 'start_date', 'end_date']
+
+
+def project_person(raw: dict) -> dict:
+    """Keeps the fields of a Harmonic person payload that are used by the analysis."""
+    return {
+        'entity_urn': raw.get('entity_urn'),
+        'full_name': raw.get('full_name'),
+        'experience': [
+            {field: experience.get(field) for field in EXPERIENCE_FIELDS}
+            for experience in raw.get('experience') or []
+        ],
+        'education': [
+            {'school': {'name': (education.get('school') or {}).get('name')},
+             **{field: education.get(field) for field in EDUCATION_FIELDS}}
+            for education in raw.get('education') or []
+        ],
+        'highlights': [{'text': highlight.get('text')} for highlight in raw.get('highlights') or []],
+        'location': {'location': (raw.get('location') or {}).get('location')},
+        'socials': {
+            network: {'url': (social or {}).get('url')}
+            for network, social in (raw.get('socials') or {}).items()
+        },
+    }
+
+
+class PersonStore:
+    """Compact person profiles keyed by person URN, shared across companies and analyses."""
+
+    def __init__(self, ttl: int = PERSON_TTL):
+        self.ttl = ttl
+
+    def get(self, urn: str) -> dict | None:
+        return cache.get(f"harmonic_person:{PERSON_PROJECTION_VERSION}:{urn}")
+
+    def set(self, urn: str, person: dict):
+        cache.set(f"harmonic_person:{PERSON_PROJECTION_VERSION}:{urn}", person, expire=self.ttl)
@@ -1,13 +1,21 @@
 import asyncio
+import logging
 import os
 
 import httpx
 
+from providers.predictleads.technology_store import TechnologyStore, project_technology
+from providers.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
 
 class PredictleadsClient:
     base_url = 'https://predictleads.com/api/v3'
 
-    def __init__(self, api_token: str = None, api_key: str = None):
+    def __init__(self, api_token: str = None, api_key: str = None, technology_store: TechnologyStore = None):
+        self.scheduler = get_scheduler('predictleads')
+        self.technology_store = technology_store or TechnologyStore()
         self.headers = {
             'X-Api-Key': api_token or os.getenv('PREDICTLEADS_API_KEY'),
             'X-Api-Token': api_key or os.getenv('PREDICTLEADS_API_TOKEN')
@@ -15,38 +23,105 @@ class PredictleadsClient:
 
     async def fetch_company(self, website_domain: str) -> dict:
         url = f"https://predictleads.com/api/v3/companies/{website_domain}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self.scheduler.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
 
     async def fetch_technologies(self, website_domain: str) -> dict:
         url = f"https://predictleads.com/api/v3/companies/{website_domain}/technology_detections?limit=50"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self.scheduler.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
 
     async def fetch_tech_name(self, tech_id: str) -> dict:
         url = f"https://predictleads.com/api/v3/technologies/{tech_id}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        response = await self.scheduler.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch_technologies_page(self, page: int = 1, limit: int = 1000) -> dict:
+        response = await self.scheduler.get(
+            f'{self.base_url}/technologies',
+            params={'page': page, 'limit': limit},
+            headers=self.headers
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def warm_up_technologies(self, max_pages: int = 10, limit: int = 1000, force: bool = False) -> int:
+        """
+        Loads the technology catalog into the technology store, page by page.
+        Nothing is fetched when the catalog was already loaded within the store TTL, unless `force` is set.
+
+        Args:
+            max_pages (int): Maximum number of pages to load
+            limit (int): Technologies per page
+            force (bool): Reload a catalog that is already loaded
+
+        Returns:
+            int: The number of technologies stored
+        """
+        if not force and self.technology_store.catalog_loaded():
+            return 0
+        count = 0
+        for page in range(1, max_pages + 1):
+            records = (await self.fetch_technologies_page(page, limit)).get('data') or []
+            count += self.technology_store.add_records(records)
+            if len(records) < limit:
+                break
+        if count:
+            self.technology_store.set_catalog_loaded(count)
+        return count
+
+    async def get_technologies(self, tech_ids: list[str], included: list[dict] = None) -> dict[str, dict]:
+        """
+        Resolves technology ids into their `name` and `categories`.
+        The technology store is read first, then the records `included` in a detections response;
+        the remaining ids are fetched concurrently and stored.
+
+        Args:
+            tech_ids (list[str]): Technology ids
+            included (list[dict]): The `included` records of a technology detections response
+
+        Returns:
+            dict[str, dict]: The technologies by id, the ones that could not be resolved are left out
+        """
+        if included:
+            self.technology_store.add_records(included)
+        technologies = {}
+        missing = []
+        for tech_id in dict.fromkeys(tech_ids):
+            if (technology := self.technology_store.get(tech_id)) is not None:
+                technologies[tech_id] = technology
+            else:
+                missing.append(tech_id)
+
+        async def fetch(tech_id):
+            try:
+                records = (await self.fetch_tech_name(tech_id)).get('data') or []
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to fetch the PredictLeads technology {tech_id}: {e}")
+                return
+            if records:
+                technologies[tech_id] = project_technology(records[0])
+                self.technology_store.set(tech_id, technologies[tech_id])
+
+        await asyncio.gather(*(fetch(tech_id) for tech_id in missing))
+        return {tech_id: technologies[tech_id] for tech_id in dict.fromkeys(tech_ids) if tech_id in technologies}
+
+    async def fetch_github_repos(self, website_domain: str) -> list[str]:
+        """Returns the full names ("owner/name") of every GitHub repository of a company."""
+        response = await self.scheduler.get(
+            f'{self.base_url}/companies/{website_domain}/github_repositories',
+            headers=self.headers
+        )
+        response.raise_for_status()
+        data = response.json()
+        return ['/'.join(item['attributes']['url'].rstrip('/').split('/')[-2:]) for item in data['data']]
 
     async def fetch_github(self, website_domain: str) -> str | None:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url=f'{self.base_url}/companies/{website_domain}/github_repositories',
-                headers=self.headers
-            )
-            response.raise_for_status()
-            data = response.json()
-            if len(data['data']) == 0:
-                return None
-            url = data['data'][0]['attributes']['url']
-            fullname = '/'.join(url.split('/')[-2:])
-            return fullname
+        repos = await self.fetch_github_repos(website_domain)
+        return repos[0] if repos else None
 
 
 async def main():
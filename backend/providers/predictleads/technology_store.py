@@ -0,0 +1,39 @@
+from cache import cache
+
+# Technology ids form a small global vocabulary whose names and categories hardly ever change
+TECHNOLOGY_TTL = 180 * 24 * 3600
+
+
+def project_technology(record: dict) -> dict:
+    """Keeps the name and categories of a PredictLeads technology record."""
+    attributes = record.get('attributes') or {}
+    return {'name': attributes.get('name'), 'categories': attributes.get('categories') or []}
+
+
+class TechnologyStore:
+    """Names and categories of PredictLeads technologies keyed by technology id."""
+
+    def __init__(self, ttl: int = TECHNOLOGY_TTL):
+        self.ttl = ttl
+
+    def get(self, tech_id: str) -> dict | None:
+        return cache.get(f"predictleads_technology:{tech_id}")
+
+    def set(self, tech_id: str, technology: dict):
+        cache.set(f"predictleads_technology:{tech_id}", technology, expire=self.ttl)
+
+    def catalog_loaded(self) -> bool:
+        """Whether the whole technology catalog was loaded within the TTL."""
+        return cache.get("predictleads_technology_catalog") is not None
+
+    def set_catalog_loaded(self, count: int):
+        cache.set("predictleads_technology_catalog", count, expire=self.ttl)
+
+    def add_records(self, records: list[dict]) -> int:
+        """Stores the technology records of a JSON:API response (`data` or `included`), returns how many were stored."""
+        count = 0
+        for record in records:
+            if record.get('type') == 'technology' and record.get('id'):
+                self.set(record['id'], project_technology(record))
+                count += 1
+        return count
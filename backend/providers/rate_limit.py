@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by every request sent to a provider."""
+
+    def __init__(self, rate: float, burst: int = None):
+        """
+        @param rate: Requests per second
+        @param burst: Requests that can be sent at once after an idle period, defaults to one second worth of requests
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: int = 1):
+        # Waiters are served in order, the lock is held while waiting for the bucket to refill
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+    def pause(self, seconds: float):
+        """Holds every request back for `seconds`, e.g. when the provider answered with a Retry-After."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from providers.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Requests per second of each provider, overridable with <PROVIDER>_RATE_LIMIT
+PROVIDER_RATES = {
+    'harmonic': 10,
+    'predictleads': 5,
+    'github': 10,
+    'google_cse': 1.5,
+    'similarweb': 5,
+}
+DEFAULT_RATE = 5
+
+RETRIED_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ProviderUnavailableError(httpx.TransportError):
+    """
+    Raised without sending the request while the circuit breaker of a provider is open.
+    It is a transport error, so callers degrading on `httpx.HTTPError` handle it as an unreachable provider.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, making requests fail fast for `reset_timeout` seconds.
+    After that, a single trial request is let through: its success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    def check(self) -> bool:
+        """
+        Raises while the breaker is open, returns whether the request about to be sent is the trial one.
+        """
+        if self.opened_at is None:
+            return False
+        if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_in_flight:
+            raise ProviderUnavailableError(f"{self.name} is unavailable, retry later")
+        self._trial_in_flight = True
+        return True
+
+    def end_trial(self):
+        """Lets another trial through when the previous one ended without a verdict (rate limited, cancelled)."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"{self.name} failed {self.failures} times in a row, opening the circuit")
+            self.opened_at = time.monotonic()
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parses the Retry-After header, given either in seconds or as an HTTP date."""
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderScheduler:
+    """
+    Sends the requests of a provider on a shared connection pool, paced by a token bucket.
+    429 and 5xx responses are retried with jittered exponential backoff, honoring Retry-After,
+    and a circuit breaker fails fast while the provider is down.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = None, max_retries: int = 4,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, timeout: float = 30.0):
+        self.name = name
+        self.rate_limiter = RateLimiter(rate, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Connections belong to the event loop they were opened in
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+            self._client_loop = loop
+        return self._client
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        return min(30.0, 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request and returns its response. The last response is returned when the retries are exhausted,
+        so `raise_for_status` keeps working as usual.
+
+        Raises:
+            ProviderUnavailableError: While the circuit breaker is open
+            httpx.TransportError: When the provider cannot be reached after the retries
+        """
+        for attempt in range(self.max_retries + 1):
+            trial = self.breaker.check()
+            try:
+                await self.rate_limiter.acquire()
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    self.breaker.record_failure()
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self.backoff(attempt)
+                    logger.info(f"{self.name} request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                # Secondary rate limits (e.g. GitHub) answer 403 with a Retry-After
+                rate_limited = response.status_code == 429 or (
+                        response.status_code == 403 and 'retry-after' in response.headers)
+                if response.status_code not in RETRIED_STATUS_CODES or rate_limited:
+                    # A rate-limited provider is up, only a 5xx counts as a failure
+                    self.breaker.record_success()
+                    if not rate_limited:
+                        return response
+                else:
+                    self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                logger.info(f"{self.name} answered {response.status_code}, retrying in {delay:.1f}s")
+                if rate_limited:
+                    # The quota is shared, hold back every request to this provider, not only this one
+                    self.rate_limiter.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+            finally:
+                # A cancelled trial must not keep the breaker open forever
+                if trial:
+                    self.breaker.end_trial()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+
+_schedulers: dict[str, ProviderScheduler] = {}
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """Returns the scheduler shared by every client of a provider."""
+    if provider not in _schedulers:
+        rate = float(os.getenv(f"{provider.upper()}_RATE_LIMIT", PROVIDER_RATES.get(provider, DEFAULT_RATE)))
+        _schedulers[provider] = ProviderScheduler(provider, rate)
+    return _schedulers[provider]
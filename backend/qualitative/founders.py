@@ -1,11 +1,17 @@
 from collections import defaultdict
+import hashlib
 import json
-from openai import OpenAI
+
+from cache import cache
+from llm import complete
+
+# A founder's qualification is reused across companies as long as their profile does not change
+FOUNDER_QUALIFICATION_TTL = 90 * 24 * 3600
 
 def wrap_triple_quotes(text: str):
     return f"```\n{text}\n```"
 
-def enhance_founder_background(company_prompt: str = None, experience_prompt: str = None, education_prompt: str = None, tags_prompt: str = None):
+async def enhance_founder_background(company_prompt: str = None, experience_prompt: str = None, education_prompt: str = None, tags_prompt: str = None):
     messages = [
         {"role": "developer", "content": "You are a VC analyst, your role is to investigate and rationalize an investment decision on a company. To do so, you have to qualify each experience and education of the current startup founder. Given the startup description, tags and experience and education background of the founder."},
         {"role": "user", "content": f"""
@@ -16,9 +22,8 @@ def enhance_founder_background(company_prompt: str = None, experience_prompt: st
 """}
     ]
 
-    response = OpenAI().chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
+    completion = await complete(
+        messages,
         response_format={
             "type": "json_schema",
             "json_schema": {
@@ -168,7 +173,6 @@ def enhance_founder_background(company_prompt: str = None, experience_prompt: st
         }
     )
 
-    completion = response.choices[0].message.content
     try:
         parsed_completion = json.loads(completion)
         return parsed_completion
@@ -176,8 +180,28 @@ def enhance_founder_background(company_prompt: str = None, experience_prompt: st
         print(e)
 
 
-def qualify_founder(company: any = None, founder: any = None):
+def founder_profile_hash(founder: dict) -> str:
+    """Hash of the parts of a founder profile the qualification is based on."""
+    profile = {'experience': founder.get('experience'), 'education': founder.get('education')}
+    return hashlib.sha256(json.dumps(profile, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def qualify_founder(company: any = None, founder: any = None):
+    """Qualifies a founder, cached by person URN and profile hash."""
+    urn = founder.get('entity_urn')
+    key = f"founder_qualification:{urn}:{founder_profile_hash(founder)}" if urn else None
+    if key and (qualification := cache.get(key)) is not None:
+        return qualification
+
+    qualification = await _qualify_founder(company, founder)
+    if key and qualification is not None:
+        cache.set(key, qualification, expire=FOUNDER_QUALIFICATION_TTL)
+    return qualification
+
+
+async def _qualify_founder(company: any = None, founder: any = None):
     tags_prompt: str = ''
+    education_prompt: str = ''
 
     if 'tags_v2' in company:
         tags_prompt = ''
@@ -254,4 +278,4 @@ startup description:
 """
 
     # print(company_prompt, experience_prompt, education_prompt, tags_prompt)
-    return enhance_founder_background(company_prompt=company_prompt, experience_prompt=experience_prompt, education_prompt=education_prompt, tags_prompt=tags_prompt)
\ No newline at end of file
+    return await enhance_founder_background(company_prompt=company_prompt, experience_prompt=experience_prompt, education_prompt=education_prompt, tags_prompt=tags_prompt)
\ No newline at end of file
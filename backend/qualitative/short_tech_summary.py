@@ -1,13 +1,22 @@
-from openai import OpenAI
 import json
 import os
+import re
 
-openai_client = OpenAI()
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from llm import complete
+from services.website_crawler import url_priority
+
+RELEVANT_HEADING_KEYWORDS = re.compile(
+    r'\b(about|team|founders?|mission|product|platform|technology|pricing|customers?|how it works|api|docs)\b',
+    re.IGNORECASE
+)
 
 def wrap_triple_quotes(text: str):
     return f"```\n{text}\n```"
 
-def extract_relevant_pages_url(webpage_urls: list[str]):
+async def extract_relevant_pages_url(webpage_urls: list[str]):
     formatted_urls = '\n'.join([f"- {url}" for url in webpage_urls])
     messages = [
         {"role": "developer", "content": "You are a VC analyst, your role is to investigate and rationalize an investment decision on a company. You will be feeded with a list of URLs of all the pages of the company website. Your task is to identify the most relevant url to extract information from. Knowing that those relevant urls will be used to extract information about the company, its founders, its team members, its product, its business and its underlying technologies."},
@@ -16,9 +25,8 @@ def extract_relevant_pages_url(webpage_urls: list[str]):
 """}
     ]
 
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
+    completion = await complete(
+        messages,
         response_format={
             "type": "json_schema",
             "json_schema": {
@@ -38,7 +46,6 @@ def extract_relevant_pages_url(webpage_urls: list[str]):
         }
     )
 
-    completion = response.choices[0].message.content
     try:
         parsed_completion = json.loads(completion)
         return parsed_completion.get('urls')
@@ -46,7 +53,44 @@ def extract_relevant_pages_url(webpage_urls: list[str]):
         print(e)
 
 
-def generate_company_tech_summary(company = None, webpages: dict = None, domain: str = None, main_techs: list = None, specific_techs: list = None):
+def rank_relevant_pages(webpages: dict, description: str = None, top_k: int = 5) -> list[str]:
+    """
+    Ranks the crawled pages locally, without any LLM call, by combining:
+    - the URL path (about, team, pricing, docs... pages first)
+    - the markdown headings mentioning the company, its team or its product
+    - the TF-IDF similarity between the page and the company description
+    Returns an empty list when none of the signals can tell the pages apart.
+    """
+    urls = list(webpages.keys())
+    if not urls:
+        return []
+    contents = [webpages[url] or '' for url in urls]
+
+    path_scores = np.array([max(url_priority(url), 0) for url in urls], dtype=float)
+    heading_scores = np.array([
+        sum(1 for line in content.splitlines() if line.startswith('#') and RELEVANT_HEADING_KEYWORDS.search(line))
+        for content in contents
+    ], dtype=float)
+    similarity_scores = np.zeros(len(urls))
+    if description:
+        try:
+            tfidf = TfidfVectorizer(stop_words='english', sublinear_tf=True).fit_transform(contents + [description])
+            # Rows are L2-normalized, the dot product is the cosine similarity
+            similarity_scores = (tfidf[:-1] @ tfidf[-1].T).toarray().ravel()
+        except ValueError:
+            # Empty vocabulary, e.g. pages without any text
+            pass
+
+    def normalize(scores):
+        return scores / scores.max() if scores.max() > 0 else scores
+
+    scores = 0.4 * normalize(path_scores) + 0.2 * normalize(heading_scores) + 0.4 * normalize(similarity_scores)
+    if scores.max() <= 0:
+        return []
+    return [urls[i] for i in np.argsort(-scores, kind='stable')[:top_k]]
+
+
+async def generate_company_tech_summary(company = None, webpages: dict = None, domain: str = None, main_techs: list = None, specific_techs: list = None, llm_fallback: bool = False):
     if not domain:
         raise Exception("Please provide a domain")
 
@@ -56,7 +100,9 @@ def generate_company_tech_summary(company = None, webpages: dict = None, domain:
     if not webpages:
         raise Exception("Please provide a webpages object")
 
-    relevant_pages = extract_relevant_pages_url(webpages.keys())
+    relevant_pages = rank_relevant_pages(webpages, company.get('description'))
+    if not relevant_pages and llm_fallback:
+        relevant_pages = await extract_relevant_pages_url(webpages.keys())
 
     company_description_prompt = ''
     if company.get('description'):
@@ -80,9 +126,8 @@ def generate_company_tech_summary(company = None, webpages: dict = None, domain:
 """}
     ]
 
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
+    completion = await complete(
+        messages,
         response_format={
             "type": "json_schema",
             "json_schema": {
@@ -99,7 +144,6 @@ def generate_company_tech_summary(company = None, webpages: dict = None, domain:
         }
     )
 
-    completion = response.choices[0].message.content
     try:
         parsed_completion = json.loads(completion)
         return parsed_completion.get('summary')
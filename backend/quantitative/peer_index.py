@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from cache import cache
+from quantitative.peer_scoring import FEATURE_NAMES, extract_features
+
+# Tag types defining the cohorts a company is benchmarked in
+COHORT_TAG_TYPES = ('INDUSTRY', 'MARKET_VERTICAL', 'TECHNOLOGY_TYPE', 'CUSTOMER_TYPE')
+
+
+def company_cohorts(company) -> list[str]:
+    return sorted({
+        f"{tag['type']}:{tag['display_value']}"
+        for tag in company.get('tags_v2', [])
+        if tag.get('type') in COHORT_TAG_TYPES and tag.get('display_value')
+    })
+
+
+_peer_index: 'PeerIndex | None' = None
+
+
+def get_peer_index() -> 'PeerIndex':
+    global _peer_index
+    if _peer_index is None:
+        _peer_index = PeerIndex()
+    return _peer_index
+
+
+class PeerIndex:
+    """
+    Persistent index of the peer features of every company fetched so far, stored in SQLite.
+    Companies are upserted incrementally, and any company can be benchmarked against a
+    tag cohort (e.g. 'INDUSTRY:Fintech') or against every indexed company.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(cache.directory, 'peer_index.sqlite')
+        self.connection = sqlite3.connect(self.path)
+        columns = ', '.join(f"{name} REAL NOT NULL" for name in FEATURE_NAMES)
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS company_features "
+                f"(entity_urn TEXT PRIMARY KEY, name TEXT, {columns}, updated_at REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS company_cohorts "
+                "(entity_urn TEXT NOT NULL, cohort TEXT NOT NULL, PRIMARY KEY (cohort, entity_urn))"
+            )
+
+    def add(self, companies: list):
+        """Inserts or refreshes the features and cohorts of companies."""
+        companies = [company for company in companies if company.get('entity_urn')]
+        if not companies:
+            return
+        features = extract_features(companies)
+        now = time.time()
+        placeholders = ', '.join('?' * (len(FEATURE_NAMES) + 3))
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO company_features VALUES ({placeholders})",
+                [(c['entity_urn'], c.get('name'), *row, now) for c, row in zip(companies, features.tolist())]
+            )
+            self.connection.executemany(
+                "DELETE FROM company_cohorts WHERE entity_urn = ?",
+                [(c['entity_urn'],) for c in companies]
+            )
+            self.connection.executemany(
+                "INSERT INTO company_cohorts VALUES (?, ?)",
+                [(c['entity_urn'], cohort) for c in companies for cohort in company_cohorts(c)]
+            )
+
+    def cohort_features(self, cohort: str = None) -> np.ndarray:
+        """Feature matrix of the companies of a cohort, or of every indexed company."""
+        columns = ', '.join(f"f.{name}" for name in FEATURE_NAMES)
+        if cohort:
+            rows = self.connection.execute(
+                f"SELECT {columns} FROM company_features f "
+                f"JOIN company_cohorts c ON c.entity_urn = f.entity_urn WHERE c.cohort = ?",
+                (cohort,)
+            ).fetchall()
+        else:
+            rows = self.connection.execute(f"SELECT {columns} FROM company_features f").fetchall()
+        return np.array(rows, dtype=float).reshape(-1, len(FEATURE_NAMES))
+
+    def percentiles(self, company, cohort: str = None) -> dict[str, float]:
+        """
+        Percentile rank of each feature of a company within a cohort (ties count for half).
+        Returns an empty dict when the cohort is empty.
+        """
+        peers = self.cohort_features(cohort)
+        if not len(peers):
+            return {}
+        values = extract_features([company])[0]
+        below = (peers < values).mean(axis=0)
+        equal = (peers == values).mean(axis=0)
+        return dict(zip(FEATURE_NAMES, np.round((below + equal / 2) * 100, 1).tolist()))
+
+    def size(self, cohort: str = None) -> int:
+        if cohort:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM company_cohorts WHERE cohort = ?", (cohort,)
+            ).fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM company_features").fetchone()[0]
@@ -0,0 +1,87 @@
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+FEATURE_NAMES = [
+    'headcount',
+    'funding_rounds_count',
+    'total_funding',
+    'last_funding',
+    'stage_score'
+]
+
+STAGE_SCORES = {
+    'SEED': 1,
+    'SERIES_A': 2,
+    'SERIES_B': 3,
+    'SERIES_C': 4,
+    'SERIES_D': 5,
+    'SERIES_E': 6,
+    'IPO': 7,
+    'ACQUIRED': 8,
+    'UNKNOWN': 0
+}
+
+
+def extract_features(companies: list) -> np.ndarray:
+    """Extracts the peer features of companies into an (n_companies, n_features) array, in a single pass."""
+    features = np.zeros((len(companies), len(FEATURE_NAMES)))
+    for i, company in enumerate(companies):
+        rounds = company.get('funding_rounds', [])
+        amounts = np.fromiter((funding_round.get('amount') or 0 for funding_round in rounds), dtype=float, count=len(rounds))
+        features[i] = (
+            float(company.get('headcount', 0)),
+            len(rounds),
+            amounts.sum(),
+            amounts[-1] if len(amounts) else 0,
+            STAGE_SCORES.get(company.get('stage', 'UNKNOWN'), 0),
+        )
+    return features
+
+
+class PeerScorer:
+    """
+    Scores a set of companies against each other with an Isolation Forest fitted once.
+    The contamination only moves the outlier threshold on the anomaly scores, so any number of
+    thresholds can be derived from a single fit.
+    """
+
+    def __init__(self, companies: list, random_state: int = 42):
+        self.companies = companies
+        self.features = extract_features(companies)
+        self.forest = None
+        self.scores = None
+        # Skip if not enough data points
+        if len(companies) >= 2:
+            self.forest = IsolationForest(random_state=random_state).fit(self.features)
+            self.scores = self.forest.score_samples(self.features)
+
+    def outliers(self, contamination: float = 0.3) -> list:
+        """Companies whose anomaly score falls in the lowest `contamination` share, as IsolationForest.predict does."""
+        if self.scores is None:
+            return []
+        threshold = np.percentile(self.scores, 100.0 * contamination)
+        return [self.companies[i] for i in np.flatnonzero(self.scores < threshold)]
+
+    def score(self, companies: list) -> np.ndarray:
+        """Anomaly scores of other companies against the fitted peers (the lower, the more abnormal)."""
+        if self.forest is None:
+            return np.zeros(len(companies))
+        return self.forest.score_samples(extract_features(companies))
+
+    def feature_importance(self) -> dict:
+        """Share of the trees using each feature in their splits, in percent."""
+        if self.forest is None:
+            return {}
+        trees_features = [estimator.tree_.feature for estimator in self.forest.estimators_]
+        tree_ids = np.repeat(np.arange(len(trees_features)), [len(f) for f in trees_features])
+        split_features = np.concatenate(trees_features)
+        # Leaves have a negative feature index
+        is_split = split_features >= 0
+        used = np.zeros((len(trees_features), len(FEATURE_NAMES)), dtype=bool)
+        used[tree_ids[is_split], split_features[is_split]] = True
+        usage = used.mean(axis=0)
+
+        total = usage.sum()
+        if total > 0:
+            usage = np.round(usage / total * 100, 2)
+        return dict(zip(FEATURE_NAMES, usage.tolist()))
@@ -0,0 +1,121 @@
+import os
+import re
+import sqlite3
+import time
+
+from cache import cache
+
+# Canonical domains of common technologies and their usual aliases
+SEED_DOMAINS: dict[str, tuple[str, list[str]]] = {
+    'React': ('react.dev', ['ReactJS', 'React.js']),
+    'Angular': ('angular.dev', ['AngularJS', 'Angular.js']),
+    'Vue.js': ('vuejs.org', ['Vue', 'VueJS']),
+    'Svelte': ('svelte.dev', ['SvelteKit']),
+    'Next.js': ('nextjs.org', ['NextJS', 'Next']),
+    'Nuxt': ('nuxt.com', ['Nuxt.js', 'NuxtJS']),
+    'Node.js': ('nodejs.org', ['Node', 'NodeJS']),
+    'Deno': ('deno.com', []),
+    'TypeScript': ('typescriptlang.org', ['TS']),
+    'JavaScript': ('developer.mozilla.org', ['JS', 'ECMAScript']),
+    'Python': ('python.org', ['Python3']),
+    'Django': ('djangoproject.com', []),
+    'Flask': ('flask.palletsprojects.com', []),
+    'FastAPI': ('fastapi.tiangolo.com', []),
+    'Ruby on Rails': ('rubyonrails.org', ['Rails', 'RoR']),
+    'Go': ('go.dev', ['Golang']),
+    'Rust': ('rust-lang.org', []),
+    'Java': ('java.com', []),
+    'Spring': ('spring.io', ['Spring Boot', 'Spring Framework']),
+    'Kotlin': ('kotlinlang.org', []),
+    'Swift': ('swift.org', []),
+    'PHP': ('php.net', []),
+    'Laravel': ('laravel.com', []),
+    '.NET': ('dotnet.microsoft.com', ['dotnet', 'ASP.NET', 'C#']),
+    'Kubernetes': ('kubernetes.io', ['K8s']),
+    'Docker': ('docker.com', []),
+    'Terraform': ('terraform.io', []),
+    'Amazon Web Services': ('aws.amazon.com', ['AWS']),
+    'AWS Glue': ('aws.amazon.com', []),
+    'Google Cloud': ('cloud.google.com', ['GCP', 'Google Cloud Platform']),
+    'Microsoft Azure': ('azure.microsoft.com', ['Azure']),
+    'PostgreSQL': ('postgresql.org', ['Postgres']),
+    'MySQL': ('mysql.com', []),
+    'MongoDB': ('mongodb.com', ['Mongo']),
+    'Redis': ('redis.io', []),
+    'Elasticsearch': ('elastic.co', ['Elastic', 'ELK']),
+    'Apache Kafka': ('kafka.apache.org', ['Kafka']),
+    'Apache Spark': ('spark.apache.org', ['Spark']),
+    'Snowflake': ('snowflake.com', []),
+    'GraphQL': ('graphql.org', []),
+    'TensorFlow': ('tensorflow.org', []),
+    'PyTorch': ('pytorch.org', ['Torch']),
+    'OpenAI': ('openai.com', ['ChatGPT', 'GPT']),
+    'Stripe': ('stripe.com', []),
+    'Twilio': ('twilio.com', []),
+    'Shopify': ('shopify.com', []),
+    'Salesforce': ('salesforce.com', []),
+    'HubSpot': ('hubspot.com', []),
+    'Segment': ('segment.com', []),
+    'Google Analytics': ('marketingplatform.google.com', ['GA', 'GA4']),
+    'Cloudflare': ('cloudflare.com', []),
+    'Vercel': ('vercel.com', []),
+    'Netlify': ('netlify.com', []),
+    'GitHub': ('github.com', []),
+    'Tailwind CSS': ('tailwindcss.com', ['Tailwind', 'TailwindCSS']),
+    'WordPress': ('wordpress.org', ['WP']),
+}
+
+# Trailing versions ("React 18", "Vue.js v3.x"), digits inside names are kept (Auth0, S3, Web3)
+VERSION_PATTERN = re.compile(r'\s+v?\d+(\.(\d+|x))*$')
+
+
+def normalize_tech_name(name: str) -> str:
+    """
+    Reduces the variants of a technology name to a single key:
+    "React 18", "react.js", "ReactJS" and " REACT " all give "react".
+    """
+    name = VERSION_PATTERN.sub('', name.strip().lower())
+    key = re.sub(r'[^a-z0-9+#]', '', name)
+    # "vue.js", "vuejs" and "vue" are the same technology, but "js" alone is JavaScript
+    if key.endswith('js') and len(key) > 2:
+        key = key[:-2]
+    return key
+
+
+class TechDomainIndex:
+    """
+    Persistent index of technology names and aliases to the domain of their website, stored in SQLite.
+    It is seeded with common technologies and learns the domain of every other technology once found by a web search.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(cache.directory, 'tech_domains.sqlite')
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS tech_domains "
+                "(name TEXT PRIMARY KEY, domain TEXT NOT NULL, source TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            # Learned entries are kept over seeds, seeds are only added when missing
+            now = time.time()
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO tech_domains VALUES (?, ?, 'seed', ?)",
+                [(normalize_tech_name(alias), domain, now)
+                 for name, (domain, aliases) in SEED_DOMAINS.items() for alias in [name, *aliases]]
+            )
+
+    def get(self, name: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT domain FROM tech_domains WHERE name = ?", (normalize_tech_name(name),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, name: str, domain: str, source: str = 'search'):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO tech_domains VALUES (?, ?, ?, ?)",
+                (normalize_tech_name(name), domain, source, time.time())
+            )
+
+    def size(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM tech_domains").fetchone()[0]
@@ -1,15 +1,29 @@
+import asyncio
+import logging
+import warnings
 import numpy as np
 import datetime
 import dotenv
 import os
-import requests
 from urllib.parse import urlparse
 
+from providers.scheduler import get_scheduler
+from quantitative.tech_domains import TechDomainIndex
+from quantitative.traffic_store import TrafficStore, month_range
+
+logger = logging.getLogger(__name__)
+
 dotenv.load_dotenv()
 SIMILARWEB_API_KEY = os.getenv("SIMILARWEB_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_SEARCH_ENGINE_ID = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
 
+# SimilarWeb publishes a month with a lag, the visits of the last months may be missing at first
+PUBLICATION_LAG_MONTHS = 2
+
+_tech_domain_index: TechDomainIndex | None = None
+_traffic_store: TrafficStore | None = None
+
 
 def url_to_domain(url):
     # Parse the URL and extract the domain name
@@ -17,13 +31,13 @@ def url_to_domain(url):
     return parsed_url.netloc or parsed_url.path
 
 
-def find_url_for_keyword(keyword):
+async def find_url_for_keyword(keyword):
     api_key = GOOGLE_API_KEY
     cse_id = GOOGLE_SEARCH_ENGINE_ID
     
-    search_url = f"https://www.googleapis.com/customsearch/v1?q={keyword}&key={api_key}&cx={cse_id}"
+    search_url = "https://www.googleapis.com/customsearch/v1"
     
-    response = requests.get(search_url)
+    response = await get_scheduler('google_cse').get(search_url, params={"q": keyword, "key": api_key, "cx": cse_id})
     if response.status_code != 200:
         print(f"Error: {response.status_code}")
         return None
@@ -38,17 +52,97 @@ def find_url_for_keyword(keyword):
     return None
 
 
-def analyze_visits(response_json):
-    # Extract visits data
-    visits = [entry['visits'] for entry in response_json['visits']]
+def trend_months(count: int = 12) -> list[str]:
+    """The last `count` complete months, as "YYYY-MM"."""
+    last_month = np.datetime64(datetime.date.today(), 'M') - 1
+    return month_range(str(last_month - (count - 1)), str(last_month))
+
+
+def trend_statistics(visits: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Computes the trend of every row of a (series x months) array of visits in one vectorized pass, NaNs being unknown:
+    the `latest` known visits, the least-squares `slope` in visits per month, the `growth_pct` between
+    the first and the latest known months and the `volatility` (standard deviation of the month-over-month growth).
+    """
+    known = ~np.isnan(visits)
+    counts = known.sum(axis=1)
+    rows = np.arange(visits.shape[0])
+    x = np.broadcast_to(np.arange(visits.shape[1], dtype=float), visits.shape)
+    y = np.where(known, visits, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # Rows with less than two known months give NaN statistics
+        warnings.simplefilter('ignore', RuntimeWarning)
+        x_mean = np.where(known, x, 0.0).sum(axis=1) / counts
+        y_mean = y.sum(axis=1) / counts
+        dx = np.where(known, x - x_mean[:, None], 0.0)
+        slope = (dx * (y - y_mean[:, None])).sum(axis=1) / (dx ** 2).sum(axis=1)
+
+        first = visits[rows, known.argmax(axis=1)]
+        latest = visits[rows, visits.shape[1] - 1 - known[:, ::-1].argmax(axis=1)]
+        growth_pct = (latest - first) / first * 100
+
+        changes = visits[:, 1:] / visits[:, :-1] - 1
+        changes[~np.isfinite(changes)] = np.nan
+        volatility = np.nanstd(changes, axis=1)
+    return {'latest': latest, 'slope': slope, 'growth_pct': growth_pct, 'volatility': volatility}
+
+
+def get_tech_domain_index() -> TechDomainIndex:
+    global _tech_domain_index
+    if _tech_domain_index is None:
+        _tech_domain_index = TechDomainIndex()
+    return _tech_domain_index
+
+
+async def find_domain_for_tech(tech_name: str) -> str | None:
+    """
+    Returns the domain of a technology's website, e.g. "Kubernetes" -> "kubernetes.io".
+    The local index is looked up first, a web search is only spent on unknown technologies and its result is learned.
+    """
+    index = get_tech_domain_index()
+    domain = index.get(tech_name)
+    if domain is None:
+        tech_url = await find_url_for_keyword(tech_name)
+        if tech_url is None:
+            return None
+        domain = url_to_domain(tech_url).removeprefix('www.')
+        index.add(tech_name, domain)
+        logger.info(f"Learned the domain of {tech_name}: {domain}")
+    return domain
+
+
+def get_traffic_store() -> TrafficStore:
+    global _traffic_store
+    if _traffic_store is None:
+        _traffic_store = TrafficStore()
+    return _traffic_store
+
+
+async def update_monthly_visits(domain: str, months: list[str]):
+    """Fetches from SimilarWeb the monthly visits of a domain that are missing from the store."""
+    store = get_traffic_store()
+    missing = store.missing_months(domain, months, pending_since=months[-PUBLICATION_LAG_MONTHS])
+    if not missing:
+        return
+    start_date, end_date = missing[0], missing[-1]
+    url = f"https://api.similarweb.com/v1/website/{domain}/total-traffic-and-engagement/visits?api_key={SIMILARWEB_API_KEY}&start_date={start_date}&end_date={end_date}&country=world&granularity=monthly&main_domain_only=false&format=json&show_verified=false&mtd=false&engaged_only=false"
 
-    # Latest number of visits
-    latest_visits = visits[-1]
+    headers = {
+        "Accept": "application/json"
+    }
+    response = await get_scheduler('similarweb').get(url, headers=headers)
+    response.raise_for_status()
+    visits = {month: None for month in month_range(start_date, end_date)}
+    for entry in response.json().get('visits') or []:
+        visits[entry['date'][:7]] = entry['visits']
+    store.add(domain, visits)
 
-    # Calculate the trend using the slope of a linear fit
-    slope = np.polyfit(range(len(visits)), visits, 1)[0]
 
-    # Determine the trend
+def _describe_trend(statistics: dict[str, np.ndarray], i: int) -> dict | None:
+    latest = statistics['latest'][i]
+    if np.isnan(latest):
+        return None
+    slope = statistics['slope'][i]
     if slope > 0:
         trend = "ascending"
     elif slope < 0:
@@ -56,32 +150,57 @@ def analyze_visits(response_json):
     else:
         trend = "flat"
 
-    return int(latest_visits), trend
-
-
-def get_trends(tech_name):
-    tech_url = find_url_for_keyword(tech_name)
-    domain = url_to_domain(tech_url)
-    start_date = (datetime.datetime.now() -
-                  datetime.timedelta(days=395)).strftime("%Y-%m")
-    end_date = (datetime.datetime.now() -
-                datetime.timedelta(days=30)).strftime("%Y-%m")
-    url = f"https://api.similarweb.com/v1/website/{domain}/total-traffic-and-engagement/visits?api_key={SIMILARWEB_API_KEY}&start_date={start_date}&end_date={end_date}&country=world&granularity=monthly&main_domain_only=false&format=json&show_verified=false&mtd=false&engaged_only=false"
+    def rounded(value):
+        return round(float(value), 2) if np.isfinite(value) else None
 
-    headers = {
-        "Accept": "application/json"
+    return {
+        "last_month_visits": int(latest),
+        "trend": trend,
+        "growth_pct": rounded(statistics['growth_pct'][i]),
+        "volatility": rounded(statistics['volatility'][i])
     }
-    response = requests.get(url, headers=headers)
-    analysis = analyze_visits(response.json())
-    return {"last_month_visits" : analysis[0], "trend": analysis[1]}
 
 
-if __name__ == "__main__":
-    techs = ["AWS GLUE", "Kubernetes", "Docker", "React", "Angular", "Vue.js"]
-    ret = dict()
-    for tech in techs:
+async def get_trends_for_techs(tech_names: list[str]) -> dict[str, dict | None]:
+    """
+    Resolves the trends of many technologies. Their domains are resolved and their missing months fetched concurrently,
+    the providers' schedulers pacing the requests; the statistics are then computed for all of them at once
+    from the local store. Technologies whose trend cannot be found are mapped to None.
+    """
+    async def find_domain_safely(tech_name):
+        try:
+            return await find_domain_for_tech(tech_name)
+        except Exception as e:
+            logger.warning(f"Failed to find the website of {tech_name}: {e}")
+            return None
+
+    async def update_safely(domain):
         try:
-            ret[tech] = get_trends(tech)
+            await update_monthly_visits(domain, months)
         except Exception as e:
-            print(f"Failed to get trends for {tech}: {e}")
-    print(ret)
+            logger.warning(f"Failed to get the visits of {domain}: {e}")
+
+    domains = dict(zip(tech_names, await asyncio.gather(*(find_domain_safely(name) for name in tech_names))))
+    unique_domains = list(dict.fromkeys(domain for domain in domains.values() if domain))
+    months = trend_months()
+    await asyncio.gather(*(update_safely(domain) for domain in unique_domains))
+
+    statistics = trend_statistics(get_traffic_store().matrix(unique_domains, months))
+    trends = {domain: _describe_trend(statistics, i) for i, domain in enumerate(unique_domains)}
+    return {name: trends.get(domains[name]) for name in tech_names}
+
+
+async def get_trends(tech_name):
+    trends = (await get_trends_for_techs([tech_name]))[tech_name]
+    if trends is None:
+        raise ValueError(f"No trends found for {tech_name}")
+    return trends
+
+
+async def main():
+    techs = ["AWS GLUE", "Kubernetes", "Docker", "React", "Angular", "Vue.js"]
+    print(await get_trends_for_techs(techs))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,11 @@
-from .tech_trends import get_trends
+from .tech_trends import get_trends_for_techs
 #import google.generativeai as genai
 import json
 import os
 
 import dotenv
-from openai import AsyncOpenAI
 
+from llm import complete
 from providers.harmonic import HarmonicClient
 from providers.predictleads.client import PredictleadsClient
 
@@ -15,20 +15,16 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 
 async def oa_sum_technologies(techs: list):
-    response = await AsyncOpenAI().chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful assistant, that knows a lot of technologies used by startups."
-            },
-            {
-                "role": "user",
-                "content": f"Pick 5 main technologies from the ones listed below. Return the keywords separated by a comma and nothing else. Here are the technologies: {techs}"
-            }
-        ]
-    )
-    return response.choices[0].message.content
+    return await complete([
+        {
+            "role": "system",
+            "content": "You are a helpful assistant, that knows a lot of technologies used by startups."
+        },
+        {
+            "role": "user",
+            "content": f"Pick 5 main technologies from the ones listed below. Return the keywords separated by a comma and nothing else. Here are the technologies: {techs}"
+        }
+    ])
 
 
 async def get_techs(domain_name: str):
@@ -51,12 +47,10 @@ async def get_techs(domain_name: str):
 
     ret["specific_techs"] = []
     techs = await pl_client.fetch_technologies(domain_name)
-    tech_names = []
     tech_ids = [tech['relationships']['technology']['data']['id']
                 for tech in techs.get("data", [])]
-    for tech_id in tech_ids:
-        tech_name = await pl_client.fetch_tech_name(tech_id)
-        tech_names.append(tech_name["data"][0]["attributes"]["name"])
+    technologies = await pl_client.get_technologies(tech_ids, techs.get("included"))
+    tech_names = [technology["name"] for technology in technologies.values() if technology["name"]]
 
     ret["specific_techs"] = (await oa_sum_technologies(tech_names)).split(",")
     return ret
@@ -64,11 +58,10 @@ async def get_techs(domain_name: str):
 
 async def get_all_techs_with_trends(domain_name):
     techs_list = await get_techs(domain_name)
-    specific_techs = techs_list["specific_techs"]
-    techs_list["specific_techs"] = list()
-    for tech in specific_techs:
-        techs_list["specific_techs"] += [{"name": tech,
-                                          "stats": get_trends(tech)}]
+    specific_techs = [tech.strip() for tech in techs_list["specific_techs"] if tech.strip()]
+    trends = await get_trends_for_techs(specific_techs)
+    techs_list["specific_techs"] = [{"name": tech, "stats": trends[tech]}
+                                    for tech in specific_techs if trends[tech] is not None]
     return json.dumps(techs_list)
 
 
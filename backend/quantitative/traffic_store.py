@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from cache import cache
+
+
+def month_range(start: str, end: str) -> list[str]:
+    """Months from `start` to `end` included, as "YYYY-MM"."""
+    months = np.arange(np.datetime64(start, 'M'), np.datetime64(end, 'M') + 1)
+    return [str(month) for month in months]
+
+
+class TrafficStore:
+    """
+    Persistent monthly visits per domain, stored in SQLite.
+    Past months never change, so each (domain, month) is fetched once; months without data are stored as NULL
+    so that they are not requested again, except for the recent ones that may not be published yet.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(cache.directory, 'traffic.sqlite')
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS monthly_visits "
+                "(domain TEXT NOT NULL, month TEXT NOT NULL, visits REAL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (domain, month))"
+            )
+
+    def missing_months(self, domain: str, months: list[str], pending_since: str = None,
+                       retry_after: float = 24 * 3600) -> list[str]:
+        """
+        Returns the months that have to be fetched.
+        Providers publish the last months with a lag: months without data from `pending_since` on are not final,
+        they are requested again once `retry_after` seconds have passed since they were fetched.
+        """
+        stale_before = time.time() - retry_after
+        known = {
+            month for month, visits, fetched_at in self.connection.execute(
+                f"SELECT month, visits, fetched_at FROM monthly_visits "
+                f"WHERE domain = ? AND month IN ({', '.join('?' * len(months))})",
+                (domain, *months)
+            )
+            if visits is not None or pending_since is None or month < pending_since or fetched_at > stale_before
+        }
+        return [month for month in months if month not in known]
+
+    def add(self, domain: str, visits: dict[str, float | None]):
+        """Stores the visits of a domain by month, None for the months without data."""
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO monthly_visits VALUES (?, ?, ?, ?)",
+                [(domain, month, value, now) for month, value in visits.items()]
+            )
+
+    def matrix(self, domains: list[str], months: list[str]) -> np.ndarray:
+        """Visits as a (domains x months) array, NaN where unknown."""
+        values = np.full((len(domains), len(months)), np.nan)
+        if not domains or not months:
+            return values
+        rows = {domain: i for i, domain in enumerate(domains)}
+        columns = {month: j for j, month in enumerate(months)}
+        for domain, month, visits in self.connection.execute(
+                f"SELECT domain, month, visits FROM monthly_visits "
+                f"WHERE domain IN ({', '.join('?' * len(rows))}) AND month BETWEEN ? AND ?",
+                (*rows, months[0], months[-1])
+        ):
+            if visits is not None and month in columns:
+                values[rows[domain], columns[month]] = visits
+        return values
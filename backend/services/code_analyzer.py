@@ -1,14 +1,29 @@
+import asyncio
+import json
 import os
 import re
 import shutil
 import subprocess
 import logging
 
-from openai import OpenAI
+from cache import cache
+from llm import complete
 
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the per-file metrics or the assessment prompt change, so that
+# cached results computed by an older analyzer are not reused.
+ANALYZER_VERSION = 2
+
+# Blob SHAs identify contents, the TTL only bounds the size of the cache
+BLOB_TTL = 90 * 24 * 3600
+
+# Unseen files are assessed in groups of at most that many characters, one LLM call per group
+ASSESSMENT_GROUP_CHARS = 20000
+
+COMMENT_PREFIXES = ('#', '//', '/*', '*', '--', ';', '<!--', '"""', "'''")
+
 
 class CodeQualityAnalyzer:
     _report: str = None
@@ -37,68 +52,179 @@ class CodeQualityAnalyzer:
             # Remove the local path if it already exists to avoid conflicts
             self.clear_local_path()
 
-            # Use git clone to download the repository
+            # Use git clone to download the repository (only HEAD is analyzed, history is not needed)
             repo_url = f'https://github.com/{self.owner}/{self.repo}'
 
-            subprocess.run(["git", "clone", repo_url, self.local_path], check=True)
+            subprocess.run(["git", "clone", "--depth", "1", repo_url, self.local_path], check=True)
             logger.info(f"Repository cloned successfully to {self.local_path}")
             return True
         except subprocess.CalledProcessError as e:
             logger.info(f"Error cloning repository: {e}")
             return False
 
-    def combine_files_to_string(self, max_lines: int = 500, max_chars: int = 100000, max_files: int = 100) -> str:
-        """Combines files into a single string with specified limits."""
-        combined_string = ""
-        index = 0
-        for root, _, files in os.walk(self.local_path):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                index += 1
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-                        if len(lines) > max_lines:
-                            lines = lines[:max_lines]
-                        file_content = "".join(lines)
-                except Exception:
-                    continue
-                combined_string += file_content
-                if len(combined_string) > max_chars or index >= max_files:
-                    return combined_string[:max_chars]
-        return combined_string
-
-    def assess_code(self, code_snippet: str) -> str:
-        """Sends code to GPT-4 mini model for assessment."""
-
-        # TODO: Improve prompt to be more specific
-        response = OpenAI().chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an assistant tasked with assessing code quality. "
-                        "Rate the code from 1 to 10 and provide a short explanation for the rating. Use bullet points."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": code_snippet
+    def list_blobs(self) -> list[tuple[str, str]]:
+        """Lists the (path, git blob SHA) pairs of every file tracked at HEAD."""
+        output = subprocess.run(
+            ["git", "ls-tree", "-r", "-z", "HEAD"],
+            cwd=self.local_path, capture_output=True, text=True, check=True
+        ).stdout
+        blobs = []
+        for entry in output.split('\0'):
+            if not entry:
+                continue
+            meta, path = entry.split('\t', 1)
+            _, object_type, sha = meta.split()
+            if object_type == 'blob':
+                blobs.append((path, sha))
+        return blobs
+
+    def read_file(self, path: str, max_lines: int) -> str:
+        with open(os.path.join(self.local_path, path), 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        return "".join(lines[:max_lines])
+
+    def get_file_metrics(self, path: str, sha: str, max_lines: int) -> dict:
+        """
+        Returns the metrics of a single file, cached by git blob SHA.
+        Identical files (same content in a later commit or in a fork) are only read once.
+        """
+        key = f"blob_metrics:{ANALYZER_VERSION}:{max_lines}:{sha}"
+        metrics = cache.get(key)
+        if metrics is None:
+            try:
+                lines = self.read_file(path, max_lines).splitlines()
+                metrics = {
+                    'text': True,
+                    'chars': sum(len(line) + 1 for line in lines),
+                    'lines': len(lines),
+                    'blank_lines': sum(not line.strip() for line in lines),
+                    'comment_lines': sum(line.lstrip().startswith(COMMENT_PREFIXES) for line in lines),
+                    'max_line_length': max(map(len, lines), default=0),
                 }
-            ]
-        )
-        return response.choices[0].message.content
-
-    def run_analysis(self) -> str:
+            except Exception:
+                metrics = {'text': False, 'chars': 0, 'lines': 0, 'blank_lines': 0, 'comment_lines': 0,
+                           'max_line_length': 0}
+            cache.set(key, metrics, expire=BLOB_TTL)
+        return metrics
+
+    def select_blobs(self, max_lines: int = 500, max_chars: int = 100000, max_files: int = 100) -> list[tuple[str, str]]:
+        """Selects the text files that fit into a single assessment chunk."""
+        selected = []
+        total_chars = 0
+        for path, sha in self.list_blobs():
+            metrics = self.get_file_metrics(path, sha, max_lines)
+            if not metrics['text']:
+                continue
+            selected.append((path, sha))
+            total_chars += metrics['chars']
+            if total_chars > max_chars or len(selected) >= max_files:
+                break
+        return selected
+
+    @staticmethod
+    def _assessment_key(sha: str) -> str:
+        return f"code_assessment:{ANALYZER_VERSION}:{sha}"
+
+    @staticmethod
+    def group_blobs(blobs: list[tuple[str, str, str]], max_chars: int = ASSESSMENT_GROUP_CHARS) -> list[list]:
+        """Packs (path, sha, content) files into groups of at most `max_chars` characters."""
+        groups = []
+        group_chars = 0
+        for blob in blobs:
+            if not groups or group_chars + len(blob[2]) > max_chars:
+                groups.append([])
+                group_chars = 0
+            groups[-1].append(blob)
+            group_chars += len(blob[2])
+        return groups
+
+    async def assess_group(self, group: list[tuple[str, str, str]]) -> dict[str, dict]:
         """
-        Runs the code assessment workflow.
+        Assesses a group of files in a single LLM call.
+        @return: The `score` (1 to 10) and `notes` of each file, by blob SHA.
+        """
+        files = '\n\n'.join(f"### File {i}: {path}\n{content}" for i, (path, _, content) in enumerate(group))
+        response = await complete([
+            {
+                "role": "system",
+                "content": (
+                    "You are an assistant tasked with assessing code quality. "
+                    "Rate each file from 1 to 10 and explain the rating in one short sentence. "
+                    'Answer in JSON: {"files": [{"index": <file index>, "score": <1-10>, "notes": "<explanation>"}]}'
+                )
+            },
+            {
+                "role": "user",
+                "content": files
+            }
+        ], response_format={"type": "json_object"})
+        try:
+            results = json.loads(response)['files']
+        except (TypeError, ValueError, KeyError):
+            logger.info("Invalid code assessment, the group is skipped")
+            return {}
+        assessments = {}
+        for result in results:
+            try:
+                _, sha, _ = group[int(result['index'])]
+                assessments[sha] = {'score': min(10, max(1, int(result['score']))), 'notes': str(result.get('notes', ''))}
+            except (TypeError, ValueError, KeyError, IndexError):
+                continue
+        return assessments
+
+    async def assess_blobs(self, blobs: list[tuple[str, str]], max_lines: int = 500) -> str:
+        """
+        Assesses files one by one, each assessment being cached by blob SHA.
+        Only the files never assessed before are sent to the LLM, packed in small groups,
+        and the assessments of every file are then merged into the report.
+        """
+        assessments = {}
+        unseen = []
+        for path, sha in blobs:
+            assessment = cache.get(self._assessment_key(sha))
+            if assessment is None:
+                unseen.append((path, sha))
+            else:
+                assessments[sha] = assessment
+
+        if unseen:
+            logger.info(f"Assessing {len(unseen)} new files out of {len(blobs)}")
+            contents = await asyncio.to_thread(lambda: [self.read_file(path, max_lines) for path, _ in unseen])
+            groups = self.group_blobs([(path, sha, content) for (path, sha), content in zip(unseen, contents)])
+            for group_assessments in await asyncio.gather(*(self.assess_group(group) for group in groups)):
+                for sha, assessment in group_assessments.items():
+                    cache.set(self._assessment_key(sha), assessment, expire=BLOB_TTL)
+                    assessments[sha] = assessment
+
+        return self.merge_assessments(blobs, assessments, max_lines)
+
+    def merge_assessments(self, blobs: list[tuple[str, str]], assessments: dict[str, dict], max_lines: int = 500,
+                          max_notes: int = 10) -> str:
+        """Merges the file assessments into a report, the score being weighted by the size of the files."""
+        assessed = [(path, sha, self.get_file_metrics(path, sha, max_lines)) for path, sha in blobs if sha in assessments]
+        if not assessed:
+            return "No source file could be assessed."
+        total_chars = sum(max(metrics['chars'], 1) for _, _, metrics in assessed)
+        score = sum(assessments[sha]['score'] * max(metrics['chars'], 1) for _, sha, metrics in assessed) / total_chars
+        lines = sum(metrics['lines'] for _, _, metrics in assessed)
+        comment_lines = sum(metrics['comment_lines'] for _, _, metrics in assessed)
+
+        report = [f"Code quality: {round(score)}/10 (weighted over {len(assessed)} files)"]
+        report.append(f"- Comments: {comment_lines / max(lines, 1):.0%} of {lines} lines")
+        # Weakest files first, they tell the most about the risks
+        for path, sha, _ in sorted(assessed, key=lambda item: assessments[item[1]]['score'])[:max_notes]:
+            report.append(f"- `{path}` ({assessments[sha]['score']}/10): {assessments[sha]['notes']}")
+        return '\n'.join(report)
+
+    async def run_analysis(self) -> str:
+        """
+        Runs the code assessment workflow, git and file system work runs in a thread.
         @return: The assessment report.
         """
-        if not self.download_repo():
+        if not await asyncio.to_thread(self.download_repo):
             return ''
-        code_snippet = self.combine_files_to_string()
-        self._report = self.assess_code(code_snippet)
+        blobs = await asyncio.to_thread(self.select_blobs)
+        self._report = await self.assess_blobs(blobs)
         match = re.search(r'\d+', self._report)
         rate = 1
         if match:
@@ -110,14 +236,15 @@ class CodeQualityAnalyzer:
         else:
             self._color = 1
 
-        self.clear_local_path()
+        await asyncio.to_thread(self.clear_local_path)
+        return self._report
 
 
 def main():
     from dotenv import load_dotenv
     load_dotenv()
 
-    assessment = CodeQualityAnalyzer(owner='Sinaptik-AI', repo='pandas-ai').run_analysis()
+    assessment = asyncio.run(CodeQualityAnalyzer(owner='Sinaptik-AI', repo='pandas-ai').run_analysis())
     # Output assessment
     print("\nAssessment:\n")
     print(assessment)
@@ -0,0 +1,37 @@
+import hashlib
+from urllib.parse import urlparse
+
+from cache import cache
+
+
+class CrawlStore:
+    """
+    Crawled pages per canonical domain, with their ETag/Last-Modified validators and content hashes,
+    so that a website is crawled once and only revalidated afterwards.
+    """
+
+    def __init__(self, ttl: int = 30 * 24 * 3600):
+        self.ttl = ttl
+
+    @staticmethod
+    def canonical_domain(url: str) -> str:
+        parsed = urlparse(url if '://' in url else f'https://{url}')
+        return parsed.netloc.lower().removeprefix('www.')
+
+    @staticmethod
+    def content_hash(markdown: str) -> str:
+        return hashlib.sha256(markdown.encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint(pages: dict[str, dict]) -> str:
+        """Hash of the content of all pages, changes whenever a page is added, removed or modified."""
+        digest = hashlib.sha256()
+        for url in sorted(pages):
+            digest.update(f"{url}:{pages[url]['hash']}\n".encode())
+        return digest.hexdigest()
+
+    def get(self, domain: str) -> dict[str, dict]:
+        return cache.get(f"crawl:{domain}") or {}
+
+    def save(self, domain: str, pages: dict[str, dict]):
+        cache.set(f"crawl:{domain}", pages, expire=self.ttl)
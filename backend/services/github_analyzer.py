@@ -1,5 +1,11 @@
+import asyncio
 import datetime
 import logging
+import os
+from contextlib import aclosing
+
+import httpx
+import numpy as np
 
 from providers.github import GitHubClient
 from providers.predictleads.client import PredictleadsClient
@@ -7,15 +13,90 @@ from providers.predictleads.client import PredictleadsClient
 logger = logging.getLogger(__name__)
 
 
+# Public repositories of the owner scanned besides the main one
+MAX_REPOS = int(os.getenv('GITHUB_MAX_REPOS', 100))
+# A repository pushed to within that many days counts as active
+ACTIVE_REPO_DAYS = 90
+
+# Closed issues sampled to measure the resolution time, the most recently updated ones first
+MAX_ISSUES = int(os.getenv('GITHUB_MAX_ISSUES', 1000))
+# The metrics come from the single GraphQL payload of the repository (contributors approximated by
+# its mentionable users, the 100 most recently closed issues). Exact contributor counts and larger
+# issue samples cost extra REST requests, and are opt-in.
+REST_DETAILS = os.getenv('GITHUB_REST_DETAILS', '').lower() in ('1', 'true')
+
+
+def parse_timestamps(timestamps: list[str]) -> np.ndarray:
+    """Parses GitHub's ISO 8601 UTC timestamps ("2024-01-31T12:00:00Z") at once."""
+    return np.array([t.rstrip('Z') for t in timestamps], dtype='datetime64[s]')
+
+
+class ResolutionTimeAggregator:
+    """Mean resolution time of issues, updated one page of issues at a time."""
+
+    def __init__(self):
+        self.seen = 0
+        self.count = 0
+        self.total_days = 0.0
+
+    def add(self, issues: list[dict]):
+        self.seen += len(issues)
+        issues = [issue for issue in issues if issue.get('created_at') and issue.get('closed_at')]
+        if not issues:
+            return
+        created_at = parse_timestamps([issue['created_at'] for issue in issues])
+        closed_at = parse_timestamps([issue['closed_at'] for issue in issues])
+        days = (closed_at - created_at) / np.timedelta64(1, 'D')
+        self.count += len(days)
+        self.total_days += float(days.sum())
+
+    @property
+    def mean_days(self) -> float | None:
+        return self.total_days / self.count if self.count else None
+
+
+def aggregate_repos(repos: list[dict]) -> dict:
+    """Sums the activity of several repositories into the fields of a single repository."""
+    created_at = [repo['created_at'] for repo in repos if repo.get('created_at')]
+    pushed_at = parse_timestamps([repo['pushed_at'] for repo in repos if repo.get('pushed_at')])
+    active_since = np.datetime64('now', 's') - np.timedelta64(ACTIVE_REPO_DAYS, 'D')
+    return {
+        'repos_count': len(repos),
+        'active_repos_count': int((pushed_at >= active_since).sum()),
+        # ISO 8601 dates sort chronologically
+        'created_at': min(created_at) if created_at else None,
+        'stargazers_count': sum(repo.get('stargazers_count') or 0 for repo in repos),
+        'forks_count': sum(repo.get('forks_count') or 0 for repo in repos),
+        'commits_count': sum(repo.get('commits_count') or 0 for repo in repos),
+    }
+
+
 class GitHubAnalyzer:
     repo: str = None
     owner: str = None
+    repos: list[str] = None
     _repo_data: dict = None
+    _activity_data: dict = None
+    _user_profiles: dict = None
+    _users_report: str = None
     _color: int = None
     _report: str = None
 
-    def __init__(self, domain: str):
+    def __init__(self, domain: str, max_issues: int = MAX_ISSUES, scan_owner: bool = True, max_repos: int = MAX_REPOS,
+                 rest_details: bool = REST_DETAILS):
+        """
+        @param domain: Website domain of the company
+        @param max_issues: Closed issues sampled to measure the resolution time, beyond the GraphQL payload
+            only with `rest_details`
+        @param scan_owner: Measure the activity across every public repository of the owner, not only the main one
+        @param max_repos: Repositories of the owner scanned
+        @param rest_details: Count the contributors and page through the closed issues with extra REST requests
+        """
         self.domain = domain
+        self.max_issues = max_issues
+        self.rest_details = rest_details
+        self.scan_owner = scan_owner
+        self.max_repos = max_repos
         self.client = GitHubClient()
 
     @property
@@ -30,10 +111,19 @@ class GitHubAnalyzer:
     def repo_data(self) -> dict | None:
         return self._repo_data
 
+    @property
+    def user_profiles(self) -> dict | None:
+        return self._user_profiles
+
+    @property
+    def users_report(self) -> str | None:
+        return self._users_report
+
     async def find_github(self):
         logger.info('Finding GitHub repo...')
-        repo_full_name = await PredictleadsClient().fetch_github(self.domain)
-        if repo_full_name:
+        self.repos = await PredictleadsClient().fetch_github_repos(self.domain)
+        if self.repos:
+            repo_full_name = self.repos[0]
             self.owner, self.repo = repo_full_name.split('/')
             logger.info(f'Found GitHub repo: {repo_full_name}')
             return True
@@ -46,8 +136,32 @@ class GitHubAnalyzer:
             self._repo_data = await self.client.get_repo(self.owner, self.repo)
         return self._repo_data
 
+    async def scan_owner_repos(self) -> list[dict]:
+        if not self.scan_owner:
+            return []
+        try:
+            return await self.client.scan_owner(self.owner, self.max_repos, extra_repos=self.repos)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to scan the repositories of {self.owner}: {e}")
+            return []
+
+    async def get_activity_data(self) -> dict:
+        """
+        Activity of the owner's public repositories and of the other repositories of the company, summed up.
+        Falls back on the main repository when the owner is not scanned.
+        """
+        if self._activity_data is None:
+            # The owner's repositories are scanned while the main repository is fetched
+            repo_data, repos = await asyncio.gather(self.get_repo_data(), self.scan_owner_repos())
+            if len(repos) > 1:
+                self._activity_data = aggregate_repos(repos)
+                logger.info(f"Scanned {len(repos)} repositories of {self.owner}")
+            else:
+                self._activity_data = aggregate_repos([repo_data])
+        return self._activity_data
+
     async def get_stars_growth_rate(self) -> int:
-        repo_data = await self.get_repo_data()
+        repo_data = await self.get_activity_data()
         created_at = datetime.datetime.strptime(repo_data['created_at'], "%Y-%m-%dT%H:%M:%SZ")
         stars = repo_data['stargazers_count']
         months_since_creation = max((datetime.datetime.now() - created_at).days / 30, 1)
@@ -57,14 +171,14 @@ class GitHubAnalyzer:
         return rate
 
     async def get_forks_rate(self) -> int:
-        repo_data = await self.get_repo_data()
+        repo_data = await self.get_activity_data()
         forks = repo_data['forks_count']
         rate = int(min(10, max(1, forks / 100)))  # Normalize to a scale of 1 to 10
         logger.info(f"Forks count: {rate}")
         return rate
 
     async def get_commit_frequency_rate(self) -> int:
-        repo_data = await self.get_repo_data()
+        repo_data = await self.get_activity_data()
         commit_count = repo_data['commits_count']
         created_at = datetime.datetime.strptime(repo_data['created_at'], "%Y-%m-%dT%H:%M:%SZ")
         months_since_creation = max((datetime.datetime.now() - created_at).days / 30, 1)
@@ -74,29 +188,78 @@ class GitHubAnalyzer:
         return rate
 
     async def get_contributors_rate(self) -> int:
-        contributors = await self.client.get_contributors(self.owner, self.repo)
-        count = len(contributors)
+        count = None
+        if self.rest_details:
+            count = await self.client.count_contributors(self.owner, self.repo)
+        if count is None:
+            # Single-payload estimate, also used when GitHub does not list the contributors of a very large repository
+            count = (await self.get_repo_data())['contributors_count'] or 0
         rate = int(min(10.0, max(1.0, count / 10)))  # Normalize to a scale of 1 to 10
         logger.info(f"Contributors rate: {rate}")
         return rate
 
     async def get_issue_resolution_rate(self) -> int:
-        issues = await self.client.get_issues(self.owner, self.repo)
-        resolution_times = []
-        for issue in issues:
-            if issue.get('state') == 'closed' and 'closed_at' in issue:
-                created_at = datetime.datetime.strptime(issue['created_at'], "%Y-%m-%dT%H:%M:%SZ")
-                closed_at = datetime.datetime.strptime(issue['closed_at'], "%Y-%m-%dT%H:%M:%SZ")
-                resolution_times.append((closed_at - created_at).total_seconds() / 3600 / 24)
-        avg_resolution_time = sum(resolution_times) / len(resolution_times) if resolution_times else float('inf')
-        if avg_resolution_time == float('inf'):
+        repo_data = await self.get_repo_data()
+        aggregator = ResolutionTimeAggregator()
+        issues = repo_data['closed_issues'][:self.max_issues]
+        aggregator.add(issues)
+        if self.rest_details and repo_data['has_more_closed_issues'] and aggregator.seen < self.max_issues:
+            seen_numbers = {issue['number'] for issue in issues}
+            # Pull requests share the pages, twice as many pages as the sample are allowed
+            max_pages = 2 * -(-self.max_issues // 100)
+            async with aclosing(self.client.iter_closed_issues(self.owner, self.repo, max_pages)) as pages:
+                async for page in pages:
+                    # The first pages repeat the issues of the GraphQL payload
+                    new_issues = [issue for issue in page if issue['number'] not in seen_numbers]
+                    new_issues = new_issues[:self.max_issues - aggregator.seen]
+                    seen_numbers.update(issue['number'] for issue in new_issues)
+                    aggregator.add(new_issues)
+                    if aggregator.seen >= self.max_issues:
+                        break
+        avg_resolution_time = aggregator.mean_days
+        if avg_resolution_time is None:
             return 1
-        logger.info(f"Average issue resolution time: {avg_resolution_time:.1f} days")
-        rate = int(min(10.0, max(1.0, 30 / avg_resolution_time)))  # Normalize to a scale of 1 to 10
+        logger.info(f"Average issue resolution time: {avg_resolution_time:.1f} days "
+                    f"({aggregator.count} closed issues)")
+        rate = int(min(10.0, max(1.0, 30 / max(avg_resolution_time, 0.01))))  # Normalize to a scale of 1 to 10
         logger.info(f"Issue resolution rate: {rate}")
         return rate
 
-    async def run_analysis(self):
+    async def profile_users(self, extra_logins: list[str] = None, top_n: int = 10) -> dict[str, dict]:
+        """
+        Profiles the top contributors of the main repository and other accounts, e.g. the founders', in batched requests
+        @param extra_logins: Other GitHub logins to profile, listed first in the report
+        @param top_n: Number of top contributors
+        @return: The profiles by login
+        """
+        extra_logins = list(extra_logins or [])
+        contributors = await self.client.get_top_contributors(self.owner, self.repo, top_n)
+        contributions = {contributor['login']: contributor['contributions'] for contributor in contributors}
+        self._user_profiles = await self.client.get_users(extra_logins + list(contributions))
+
+        lines = []
+        for login, user in self._user_profiles.items():
+            role = 'founder' if login in extra_logins else f"{contributions.get(login, 0)} contributions"
+            name = f" ({user['name']})" if user.get('name') else ''
+            line = (f"- **{login}**{name}, {role}: {user.get('followers') or 0} followers, "
+                    f"{user.get('public_repos') or 0} public repositories, "
+                    f"{user.get('top_repos_stars') or 0} stars on their top repositories")
+            if user.get('bio'):
+                line += f". {user['bio']}"
+            lines.append(line)
+        self._users_report = '\n'.join(lines) or None
+        return self._user_profiles
+
+    async def _profile_users_safely(self, extra_logins: list[str] = None):
+        try:
+            await self.profile_users(extra_logins)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to profile the GitHub users of {self.owner}/{self.repo}: {e}")
+
+    async def run_analysis(self, extra_logins: list[str] = None):
+        """
+        @param extra_logins: GitHub logins profiled besides the top contributors, e.g. the founders'
+        """
         success = await self.find_github()
         if not success:
             self._color = -1
@@ -104,11 +267,17 @@ class GitHubAnalyzer:
             return
 
         # TODO: Add additional metrics
+        # The repository metrics are computed from a single GraphQL payload,
+        # the activity metrics from batched requests over the owner's repositories
+        await self.get_activity_data()
         stars_rate = await self.get_stars_growth_rate()
         forks_rate = await self.get_forks_rate()
         commit_rate = await self.get_commit_frequency_rate()
-        contributors_rate = await self.get_contributors_rate()
-        issue_resolution_rate = await self.get_issue_resolution_rate()
+        contributors_rate, issue_resolution_rate, _ = await asyncio.gather(
+            self.get_contributors_rate(),
+            self.get_issue_resolution_rate(),
+            self._profile_users_safely(extra_logins)
+        )
         # sum all rates
         total_rate = stars_rate + forks_rate + commit_rate + contributors_rate + issue_resolution_rate
         if total_rate < 10:
@@ -125,6 +294,10 @@ class GitHubAnalyzer:
 - **Contributors Rate:** {contributors_rate}/10
 - **Issue Resolution Rate:** {issue_resolution_rate}/10
 """
+        activity = await self.get_activity_data()
+        if activity['repos_count'] > 1:
+            report += (f"- **Repositories:** {activity['repos_count']} public repositories, "
+                       f"{activity['active_repos_count']} active in the last {ACTIVE_REPO_DAYS} days\n")
         self._report = report
 
 
@@ -139,5 +312,4 @@ async def main():
 
 
 if __name__ == '__main__':
-    import asyncio
     asyncio.run(main())
@@ -2,39 +2,79 @@ import asyncio
 import json
 import os
 
-from firecrawl import FirecrawlApp
-from openai import AsyncOpenAI
+from cache import cache
+from llm import complete
+from providers.firecrawl import FirecrawlClient
+from services.crawl_store import CrawlStore
+from prompt_builder import PromptBuilder
+from services.website_crawler import WebsiteCrawler, url_priority
 
 
 class WebsiteAnalyzer:
-    def __init__(self, url: str, fc_api_key: str = None):
+    def __init__(self, url: str, fc_api_key: str = None, engine: str = None, store: CrawlStore = None):
+        """
+        @param engine: 'native' to crawl with the built-in crawler, 'firecrawl' to use the Firecrawl API.
+        Defaults to the CRAWLER_ENGINE environment variable, or 'native'.
+        """
         self.url = url
-        self.fc_app = FirecrawlApp(api_key=fc_api_key or os.getenv('FIRECRAWL_API_KEY'))
-        self.openai_client = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        self.store = store or CrawlStore()
+        self.domain = CrawlStore.canonical_domain(url)
+        engine = engine or os.getenv('CRAWLER_ENGINE', 'native')
+        if engine == 'firecrawl':
+            self.crawler = FirecrawlClient(api_key=fc_api_key)
+        elif engine == 'native':
+            self.crawler = WebsiteCrawler()
+        else:
+            raise ValueError(f"Unknown crawler engine: {engine}")
         self._webpages = {}
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self) -> str | None:
+        """Hash of the crawled content, used to key the results derived from it."""
+        return self._fingerprint
+
+    async def iter_pages(self):
+        """Crawls the website and yields each page as soon as it is available."""
+        self._webpages = {}
+        known_pages = self.store.get(self.domain)
+        pages = {}
+        async for page in self.crawler.crawl(self.url, limit=5, known_pages=known_pages):
+            pages[page['url']] = {
+                'markdown': page['markdown'],
+                'etag': page.get('etag'),
+                'last_modified': page.get('last_modified'),
+                'hash': CrawlStore.content_hash(page['markdown'])
+            }
+            self._webpages[page['url']] = page['markdown']
+            yield page
+        self._fingerprint = CrawlStore.fingerprint(pages)
+        self.store.save(self.domain, pages)
 
     async def crawl(self):
-        crawl_result = self.fc_app.async_crawl_url(self.url, params={
-            'limit': 5,
-            'scrapeOptions': {'formats': ['markdown']}
-        })
-        task_id = crawl_result['id']
-        while crawl_result.get('status', 'scraping') == 'scraping':
-            crawl_result = self.fc_app.check_crawl_status(task_id)
-            await asyncio.sleep(1.0)
-        self._webpages = {
-            page['metadata']['sourceURL']: page['markdown'] for page in crawl_result['data']
-        }
+        async for _ in self.iter_pages():
+            pass
+
+    def format_webpages(self, max_tokens: int = 20000) -> str:
+        """Formats the pages under a token budget, the most informative pages (about, team...) first."""
+        urls = sorted(self._webpages, key=url_priority, reverse=True)
+        # A single page cannot take more than half of the budget when there are several
+        item_budget = max_tokens if len(urls) < 2 else max_tokens // 2
+        return PromptBuilder(max_tokens).add_items(
+            [f"## {url}\n{self._webpages[url]}\n" for url in urls],
+            item_budget=item_budget
+        ).build()
 
     @property
     def formatted_webpages(self) -> str:
-        max_chars = 100000
-        fmt_webpages = ''
-        for url, markdown in self._webpages.items():
-            fmt_webpages += f"## {url}\n{markdown}\n\n"
-        return fmt_webpages[:max_chars]
+        return self.format_webpages()
 
     async def extract_technologies(self) -> list[dict]:
+        # The technologies only depend on the content, skip the LLM when it did not change
+        cache_key = f"technologies:{self.fingerprint}"
+        if self.fingerprint and (technologies := cache.get(cache_key)) is not None:
+            return technologies
+
         def build_prompt():
             prompt = (
                     "You are an AI assistant tasked with analyzing the content of a startup's website. "
@@ -54,13 +94,14 @@ class WebsiteAnalyzer:
             return prompt
 
         # Send the prompt to OpenAI's model
-        response = await self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": build_prompt()}],
+        content = await complete(
+            [{"role": "user", "content": build_prompt()}],
             response_format={"type": "json_object"}
         )
-        content = response.choices[0].message.content
-        return json.loads(content).get('technologies')
+        technologies = json.loads(content).get('technologies')
+        if self.fingerprint and technologies is not None:
+            cache.set(cache_key, technologies, expire=self.store.ttl)
+        return technologies
 
 
 async def main():
@@ -0,0 +1,313 @@
+import asyncio
+import heapq
+import logging
+import re
+import time
+from typing import AsyncIterator
+from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+
+import httpx
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+
+logger = logging.getLogger(__name__)
+
+# Pages that tell the most about a company, crawled first
+PRIORITY_PATTERNS: list[tuple[re.Pattern, int]] = [
+    (re.compile(r'/(about|company|who-we-are)(/|$)'), 10),
+    (re.compile(r'/(team|founders|people|leadership)(/|$)'), 10),
+    (re.compile(r'/(pricing|plans)(/|$)'), 8),
+    (re.compile(r'/(docs|documentation|developers|api)(/|$)'), 8),
+    (re.compile(r'/(product|products|features|platform|solutions|technology)(/|$)'), 6),
+    (re.compile(r'/(careers|jobs)(/|$)'), 4),
+    (re.compile(r'/(blog|news|press)(/|$)'), 1),
+]
+
+SKIPPED_EXTENSIONS = (
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico', '.pdf', '.zip', '.gz',
+    '.mp4', '.mp3', '.css', '.js', '.json', '.xml', '.woff', '.woff2', '.ttf'
+)
+
+STRIPPED_TAGS = ['script', 'style', 'noscript', 'svg', 'iframe', 'nav', 'footer', 'form']
+
+# Tags rendered within the text around them rather than as blocks of their own
+INLINE_TAGS = {'a', 'span', 'strong', 'b', 'em', 'i', 'code', 'br', 'small', 'sup', 'sub', 'abbr', 'time', 'mark', 'u', 's'}
+
+
+def parse_sitemap(content: bytes) -> tuple[list[str], list[str]]:
+    """Returns the sitemaps and the pages listed by a sitemap (or a sitemap index)."""
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return [], []
+    sitemaps, pages = [], []
+    for element in root.iter():
+        # Tags are namespaced: {http://www.sitemaps.org/schemas/sitemap/0.9}url
+        name = element.tag.rsplit('}', 1)[-1]
+        if name not in ('sitemap', 'url'):
+            continue
+        loc = next((child.text for child in element if child.tag.rsplit('}', 1)[-1] == 'loc' and child.text), None)
+        if loc:
+            (sitemaps if name == 'sitemap' else pages).append(loc.strip())
+    return sitemaps, pages
+
+
+def url_priority(url: str) -> int:
+    path = urlparse(url).path.lower().rstrip('/')
+    if not path:
+        return 20
+    score = max((weight for pattern, weight in PRIORITY_PATTERNS if pattern.search(path + '/')), default=0)
+    # Prefer shallow pages: /docs over /docs/guides/advanced/setup
+    return score - path.count('/')
+
+
+def html_to_markdown(html: str | BeautifulSoup, base_url: str = '') -> str:
+    """Converts the main content of an HTML page into markdown."""
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, 'html.parser')
+    for tag in soup(STRIPPED_TAGS):
+        tag.decompose()
+    root = soup.find('main') or soup.body or soup
+
+    def inline(node) -> str:
+        if isinstance(node, PreformattedString):
+            return ''
+        if isinstance(node, NavigableString):
+            return re.sub(r'\s+', ' ', str(node))
+        if not isinstance(node, Tag):
+            return ''
+        text = ''.join(inline(child) for child in node.children)
+        if node.name == 'a' and node.get('href') and text.strip():
+            return f"[{text.strip()}]({urljoin(base_url, node['href'])})"
+        if node.name in ('strong', 'b') and text.strip():
+            return f"**{text.strip()}**"
+        if node.name in ('em', 'i') and text.strip():
+            return f"_{text.strip()}_"
+        if node.name == 'code':
+            return f"`{text.strip()}`"
+        if node.name == 'br':
+            return '\n'
+        return text
+
+    blocks = []
+
+    def walk(node):
+        # Text and inline tags directly inside a container form a paragraph
+        paragraph = []
+
+        def flush():
+            text = re.sub(r'[ \t]+', ' ', ''.join(paragraph)).strip()
+            if text:
+                blocks.append(text)
+            paragraph.clear()
+
+        for child in node.children:
+            if isinstance(child, PreformattedString):
+                continue
+            if isinstance(child, NavigableString) or (isinstance(child, Tag) and child.name in INLINE_TAGS):
+                paragraph.append(inline(child))
+                continue
+            if not isinstance(child, Tag):
+                continue
+            flush()
+            if re.fullmatch(r'h[1-6]', child.name):
+                text = inline(child).strip()
+                if text:
+                    blocks.append(f"{'#' * int(child.name[1])} {text}")
+            elif child.name == 'p':
+                text = inline(child).strip()
+                if text:
+                    blocks.append(text)
+            elif child.name in ('ul', 'ol'):
+                items = [inline(li).strip() for li in child.find_all('li', recursive=False)]
+                prefix = '1.' if child.name == 'ol' else '-'
+                blocks.append('\n'.join(f"{prefix} {item}" for item in items if item))
+            elif child.name == 'pre':
+                blocks.append(f"```\n{child.get_text().strip()}\n```")
+            elif child.name == 'table':
+                rows = []
+                for tr in child.find_all('tr'):
+                    cells = [inline(cell).strip() for cell in tr.find_all(['th', 'td'])]
+                    rows.append('| ' + ' | '.join(cells) + ' |')
+                if rows:
+                    header_cells = rows[0].count('|') - 1
+                    rows.insert(1, '|' + ' --- |' * header_cells)
+                    blocks.append('\n'.join(rows))
+            else:
+                walk(child)
+        flush()
+
+    walk(root)
+    return '\n\n'.join(block for block in blocks if block.strip())
+
+
+class WebsiteCrawler:
+    """
+    Native website crawler: sitemap-first discovery, robots.txt compliance,
+    concurrent fetching with per-host politeness and priority for the most informative pages.
+    """
+    user_agent = 'DataDrivenVCBot/1.0'
+
+    def __init__(self, max_concurrency: int = 4, host_delay: float = 0.25, timeout: float = 10.0,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.max_concurrency = max_concurrency
+        self.host_delay = host_delay
+        self.timeout = timeout
+        # Only set to serve the requests otherwise, e.g. from a local fixture in the tests
+        self.transport = transport
+        self._host_locks: dict[str, asyncio.Lock] = {}
+        self._host_last_request: dict[str, float] = {}
+
+    async def _wait_for_host(self, host: str):
+        """Spaces out the requests sent to the same host by at least `host_delay` seconds."""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._host_last_request.get(host, 0) + self.host_delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._host_last_request[host] = time.monotonic()
+
+    async def _get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response | None:
+        await self._wait_for_host(urlparse(url).netloc)
+        try:
+            return await client.get(url, **kwargs)
+        except httpx.HTTPError as e:
+            logger.info(f'Failed to fetch {url}: {e}')
+            return None
+
+    async def _load_robots(self, client: httpx.AsyncClient, origin: str) -> RobotFileParser:
+        robots = RobotFileParser()
+        response = await self._get(client, f'{origin}/robots.txt')
+        if response is not None and response.status_code == 200:
+            robots.parse(response.text.splitlines())
+        else:
+            robots.parse([])
+        return robots
+
+    async def _discover_sitemap(self, client: httpx.AsyncClient, origin: str, robots: RobotFileParser,
+                                max_sitemaps: int = 5) -> list[str]:
+        sitemaps = list(robots.site_maps() or []) or [f'{origin}/sitemap.xml']
+        urls = []
+        visited = set()
+        while sitemaps and len(visited) < max_sitemaps:
+            sitemap_url = sitemaps.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            response = await self._get(client, sitemap_url)
+            if response is None or response.status_code != 200:
+                continue
+            # Sitemap indexes list other sitemaps instead of pages
+            child_sitemaps, pages = parse_sitemap(response.content)
+            sitemaps += child_sitemaps
+            urls += pages
+        return urls
+
+    @staticmethod
+    def _normalize(url: str, base_url: str) -> str:
+        url = urldefrag(urljoin(base_url, url))[0]
+        return url.rstrip('/') or url
+
+    def _is_crawlable(self, url: str, host: str, robots: RobotFileParser) -> bool:
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc.lower().removeprefix('www.') != host:
+            return False
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+            return False
+        return robots.can_fetch(self.user_agent, url)
+
+    async def _fetch_page(self, client: httpx.AsyncClient, url: str, known: dict | None) -> dict | None:
+        """Fetches a page, revalidating it with its previous ETag/Last-Modified when it was crawled before."""
+        headers = {}
+        if known and known.get('etag'):
+            headers['If-None-Match'] = known['etag']
+        if known and known.get('last_modified'):
+            headers['If-Modified-Since'] = known['last_modified']
+        response = await self._get(client, url, headers=headers)
+        if response is None:
+            return None
+        if response.status_code == 304 and known:
+            return {
+                'url': url,
+                'html': None,
+                'markdown': known['markdown'],
+                'etag': known.get('etag'),
+                'last_modified': known.get('last_modified'),
+                'not_modified': True
+            }
+        if response.status_code != 200 or 'text/html' not in response.headers.get('content-type', ''):
+            return None
+        return {
+            'url': str(response.url),
+            'html': response.text,
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'not_modified': False
+        }
+
+    async def crawl(self, url: str, limit: int = 5, known_pages: dict[str, dict] = None) -> AsyncIterator[dict]:
+        """
+        Crawls a website and yields its pages by decreasing priority.
+
+        Args:
+            url (str): The website to crawl
+            limit (int): Maximum number of pages to crawl
+            known_pages (dict): Pages of a previous crawl by URL, with their `markdown`, `etag` and `last_modified`.
+                They are revalidated with conditional requests and reused when unchanged.
+
+        Yields:
+            dict: A page with its `url`, `markdown`, `etag`, `last_modified` and whether it was `not_modified`
+        """
+        known_pages = known_pages or {}
+        parsed = urlparse(url if '://' in url else f'https://{url}')
+        origin = f'{parsed.scheme}://{parsed.netloc}'
+        host = parsed.netloc.lower().removeprefix('www.')
+        start_url = self._normalize(parsed.geturl(), origin)
+
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={'User-Agent': self.user_agent},
+            transport=self.transport
+        ) as client:
+            robots = await self._load_robots(client, origin)
+            queue: list[tuple[int, int, str]] = []
+            queued = set()
+
+            def enqueue(candidate: str):
+                candidate = self._normalize(candidate, origin)
+                if candidate in queued or not self._is_crawlable(candidate, host, robots):
+                    return
+                queued.add(candidate)
+                heapq.heappush(queue, (-url_priority(candidate), len(queued), candidate))
+
+            enqueue(start_url)
+            # Pages of the previous crawl are known, the sitemap is only needed on the first crawl
+            for known_url in known_pages:
+                enqueue(known_url)
+            if not known_pages:
+                for sitemap_url in await self._discover_sitemap(client, origin, robots):
+                    enqueue(sitemap_url)
+
+            crawled = set()
+            while queue and len(crawled) < limit:
+                batch_size = min(self.max_concurrency, limit - len(crawled))
+                batch = [heapq.heappop(queue)[2] for _ in range(min(batch_size, len(queue)))]
+                fetches = [self._fetch_page(client, u, known_pages.get(u)) for u in batch]
+                for future in asyncio.as_completed(fetches):
+                    page = await future
+                    if page is None:
+                        continue
+                    page_url = self._normalize(page.pop('url'), origin)
+                    html = page.pop('html')
+                    if page_url in crawled or len(crawled) >= limit:
+                        continue
+                    crawled.add(page_url)
+                    queued.add(page_url)
+                    if html is not None:
+                        soup = BeautifulSoup(html, 'html.parser')
+                        for link in soup.find_all('a', href=True):
+                            enqueue(urljoin(page_url, link['href']))
+                        page['markdown'] = html_to_markdown(soup, page_url)
+                    yield {'url': page_url, **page}
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+import httpx
+
+from providers.github.client import GitHubClient
+
+
+def rate_limited_response(resource: str, remaining: int, reset: float) -> httpx.Response:
+    return httpx.Response(200, headers={
+        'x-ratelimit-resource': resource,
+        'x-ratelimit-limit': '5000',
+        'x-ratelimit-remaining': str(remaining),
+        'x-ratelimit-reset': str(int(reset)),
+    })
+
+
+def test_exhausted_resource_does_not_hold_back_the_others(monkeypatch):
+    monkeypatch.setattr(GitHubClient, 'rate_limits', {})
+    client = GitHubClient(token='test')
+    client._track_rate_limit(rate_limited_response('core', 0, time.time() + 3600))
+
+    # GraphQL has its own quota and is not held back
+    asyncio.run(asyncio.wait_for(client._wait_for_rate_limit('graphql'), timeout=1))
+    assert client.headroom('core')['remaining'] == 0
+
+
+def test_exhausted_resource_waits_for_its_reset(monkeypatch):
+    monkeypatch.setattr(GitHubClient, 'rate_limits', {})
+    client = GitHubClient(token='test')
+    client._track_rate_limit(rate_limited_response('graphql', 0, time.time() + 3600))
+
+    async def wait():
+        try:
+            await asyncio.wait_for(client._wait_for_rate_limit('graphql'), timeout=0.1)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    assert asyncio.run(wait())
@@ -0,0 +1,81 @@
+import asyncio
+
+from providers.harmonic.client import HarmonicClient
+from providers.harmonic.models import Company
+
+
+class MemoryCompanyStore:
+    def __init__(self, companies: dict[str, Company] = None):
+        self.companies = dict(companies or {})
+
+    def get(self, urn: str) -> Company | None:
+        return self.companies.get(urn)
+
+    def set(self, urn: str, company: Company):
+        self.companies[urn] = company
+
+
+class MemoryCompetitorGraph:
+    def __init__(self):
+        self.edges = {}
+
+    def neighbors(self, urn: str):
+        return self.edges.get(urn)
+
+    def set_neighbors(self, urn: str, neighbors):
+        self.edges[urn] = neighbors
+
+
+def company(urn: str, description: str, tags: list[str] = ()) -> Company:
+    return Company(entity_urn=urn, name=urn, description=description,
+                   tags_v2=[{'type': 'INDUSTRY', 'display_value': tag} for tag in tags])
+
+
+TARGET = company('target', 'Payroll software for small businesses', ['Fintech'])
+
+
+def client_with(similar: list[str], remote: dict[str, Company], stored: dict[str, Company] = None):
+    client = HarmonicClient(api_key='test', company_store=MemoryCompanyStore(stored),
+                            competitor_graph=MemoryCompetitorGraph())
+    fetched = []
+
+    async def find_company(website_domain, raw=False):
+        return TARGET
+
+    async def find_similar_urns(company_urn):
+        return similar
+
+    async def get_companies_by_urns(urns, raw=False):
+        fetched.extend(urns)
+        return {urn: remote[urn] for urn in urns}
+
+    client.find_company = find_company
+    client.find_similar_urns = find_similar_urns
+    client.get_companies_by_urns = get_companies_by_urns
+    return client, fetched
+
+
+def test_rank_by_similarity_tolerates_null_values():
+    candidates = [
+        Company(entity_urn='a', description=None, tags_v2=[{'type': 'INDUSTRY', 'display_value': None}]),
+        Company(entity_urn='b', description='Payroll for small businesses', tags=[{'display_value': 'Fintech'}]),
+        {'entity_urn': 'c', 'description': None, 'tags': [{'display_value': None}], 'tags_v2': None},
+    ]
+    scores = HarmonicClient.rank_by_similarity(TARGET, candidates)
+    assert scores[0] == 0.0 and scores[2] == 0.0
+    assert scores[1] > 0
+
+
+def test_competitors_only_fetch_the_shortlist():
+    remote = {f'c{i}': company(f'c{i}', 'Gardening tools') for i in range(10)}
+    remote['c5'] = company('c5', 'Payroll software', ['Fintech'])
+    stored = {'s0': company('s0', 'Payroll and HR software for small businesses', ['Fintech'])}
+    client, fetched = client_with(['s0'] + list(remote), remote, stored)
+
+    competitors = asyncio.run(client.get_competitors('example.com', top_k=3))
+
+    # Only the first 3 candidates missing from the store were fetched
+    assert fetched == ['c0', 'c1', 'c2']
+    assert [c['entity_urn'] for c in competitors] == ['s0', 'c0', 'c1']
+    neighbors = client.competitor_graph.neighbors('target')
+    assert [urn for urn, score in neighbors if score is None] == [f'c{i}' for i in range(3, 10)]
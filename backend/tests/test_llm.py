@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+import llm
+from llm import ModelLimiter
+
+
+def test_limiter_halves_on_rate_limit_and_grows_back():
+    async def run():
+        limiter = ModelLimiter(max_concurrency=8, tokens_per_minute=1_000_000)
+        await limiter.acquire(1)
+        await limiter.release(rate_limited=True)
+        assert limiter.limit == 4
+        await limiter.acquire(1)
+        await limiter.release(rate_limited=True)
+        assert limiter.limit == 2
+
+        # One more slot after a full window of successful calls
+        for expected in (2, 3):
+            for _ in range(expected):
+                assert limiter.limit == expected
+                await limiter.acquire(1)
+                await limiter.release()
+        assert limiter.limit == 4
+
+    asyncio.run(run())
+
+
+def test_limiter_waits_for_the_tokens_per_minute_window(monkeypatch):
+    now = [1000.0]
+    # The event loop keeps the real clock
+    monkeypatch.setattr(llm, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+
+    async def run():
+        limiter = ModelLimiter(max_concurrency=8, tokens_per_minute=1000)
+        await limiter.acquire(800)
+        await limiter.release()
+
+        waiting = asyncio.create_task(limiter.acquire(300))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        # The first call leaves the window
+        now[0] += 60
+        async with limiter._condition:
+            limiter._condition.notify_all()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert limiter._window_tokens == 300
+
+    asyncio.run(run())
+
+
+def test_limiters_are_bound_to_their_event_loop():
+    async def limiter():
+        limiter = llm.get_limiter('gpt-4o-mini')
+        await limiter.acquire(1)
+        await limiter.release()
+        return limiter
+
+    assert asyncio.run(limiter()) is not asyncio.run(limiter())
+
+
+def test_cache_key_normalizes_whitespace():
+    key = llm._cache_key('gpt-4o-mini', [{'role': 'user', 'content': 'Hello\n  world '}], None, {})
+    assert key == llm._cache_key('gpt-4o-mini', [{'role': 'user', 'content': 'Hello world'}], None, {})
+    assert key != llm._cache_key('gpt-4o', [{'role': 'user', 'content': 'Hello world'}], None, {})
+    assert key != llm._cache_key('gpt-4o-mini', [{'role': 'user', 'content': 'Hello world'}], None,
+                                 {'temperature': 0})
+
+
+def test_retry_delay_is_capped():
+    def rate_limit_error(retry_after: str) -> openai.RateLimitError:
+        request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+        response = httpx.Response(429, headers={'retry-after': retry_after}, request=request)
+        return openai.RateLimitError('Rate limited', response=response, body=None)
+
+    assert llm._retry_delay(0, rate_limit_error('2')) == 2.0
+    assert llm._retry_delay(0, rate_limit_error('86400')) == llm.MAX_RETRY_DELAY
+    assert 0.5 <= llm._retry_delay(0, rate_limit_error('soon')) <= 1.5
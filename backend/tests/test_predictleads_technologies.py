@@ -0,0 +1,74 @@
+import asyncio
+
+import providers.predictleads.client as predictleads_client
+import quantitative.techs as techs
+
+
+class MemoryTechnologyStore(predictleads_client.TechnologyStore):
+    def __init__(self):
+        super().__init__()
+        self.technologies = {}
+        self.catalog = None
+
+    def get(self, tech_id: str) -> dict | None:
+        return self.technologies.get(tech_id)
+
+    def set(self, tech_id: str, technology: dict):
+        self.technologies[tech_id] = technology
+
+    def catalog_loaded(self) -> bool:
+        return self.catalog is not None
+
+    def set_catalog_loaded(self, count: int):
+        self.catalog = count
+
+
+CATALOG = [
+    {'id': '1', 'type': 'technology', 'attributes': {'name': 'React', 'categories': ['Frameworks']}},
+    {'id': '2', 'type': 'technology', 'attributes': {'name': 'PostgreSQL', 'categories': ['Databases']}},
+]
+
+
+class FakeHarmonicClient:
+    async def find_company(self, domain_name):
+        return {'tags_v2': [], 'tags': [{'type': 'TECHNOLOGY', 'display_value': 'SaaS'}]}
+
+
+def test_get_techs_fetches_no_technology_once_warm(monkeypatch):
+    store = MemoryTechnologyStore()
+    monkeypatch.setattr(predictleads_client, 'TechnologyStore', lambda: store)
+    requested = []
+
+    async def fetch_technologies_page(self, page=1, limit=1000):
+        requested.append(('page', page))
+        return {'data': CATALOG if page == 1 else []}
+
+    async def fetch_tech_name(self, tech_id):
+        requested.append(('technology', tech_id))
+        return {'data': []}
+
+    async def fetch_company(self, domain):
+        return {'data': [{'attributes': {'company_name': 'Example', 'meta_title': None, 'meta_description': None}}]}
+
+    async def fetch_technologies(self, domain):
+        return {'data': [{'relationships': {'technology': {'data': {'id': tech['id']}}}} for tech in CATALOG]}
+
+    async def oa_sum_technologies(tech_names):
+        return ','.join(tech_names)
+
+    client = predictleads_client.PredictleadsClient
+    monkeypatch.setattr(client, 'fetch_technologies_page', fetch_technologies_page)
+    monkeypatch.setattr(client, 'fetch_tech_name', fetch_tech_name)
+    monkeypatch.setattr(client, 'fetch_company', fetch_company)
+    monkeypatch.setattr(client, 'fetch_technologies', fetch_technologies)
+    monkeypatch.setattr(techs, 'HarmonicClient', FakeHarmonicClient)
+    monkeypatch.setattr(techs, 'oa_sum_technologies', oa_sum_technologies)
+
+    assert asyncio.run(client().warm_up_technologies(limit=2)) == 2
+    # A warm catalog is not loaded again
+    assert asyncio.run(client().warm_up_technologies(limit=2)) == 0
+    assert requested == [('page', 1), ('page', 2)]
+
+    result = asyncio.run(techs.get_techs('example.com'))
+    assert result['specific_techs'] == ['React', 'PostgreSQL']
+    assert not any(kind == 'technology' for kind, _ in requested)
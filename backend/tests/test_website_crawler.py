@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from services.website_crawler import WebsiteCrawler, html_to_markdown
+
+ORIGIN = 'https://example.com'
+
+# Static site served by the mock transport: path -> (headers, body)
+SITE = {
+    '/robots.txt': ({'content-type': 'text/plain'}, f"User-agent: *\nDisallow: /private\nSitemap: {ORIGIN}/sitemap.xml\n"),
+    '/sitemap.xml': ({'content-type': 'application/xml'}, f"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{ORIGIN}/blog/launch</loc></url>
+  <url><loc>{ORIGIN}/pricing</loc></url>
+  <url><loc>{ORIGIN}/about</loc></url>
+  <url><loc>{ORIGIN}/private/roadmap</loc></url>
+</urlset>"""),
+    '/': ({'content-type': 'text/html', 'etag': '"home-v1"'},
+          '<html><body><h1>Example</h1><p>We build things.</p><a href="/private/admin">admin</a></body></html>'),
+    '/about': ({'content-type': 'text/html'}, '<html><body><h1>About us</h1><p>Founded in 2020.</p></body></html>'),
+    '/pricing': ({'content-type': 'text/html'}, '<html><body><h1>Pricing</h1><p>Free tier.</p></body></html>'),
+    '/blog/launch': ({'content-type': 'text/html'}, '<html><body><h1>Launch</h1></body></html>'),
+    '/private/roadmap': ({'content-type': 'text/html'}, '<html><body><h1>Secret</h1></body></html>'),
+    '/private/admin': ({'content-type': 'text/html'}, '<html><body><h1>Admin</h1></body></html>'),
+}
+
+
+def serve(requested: list[str]):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path not in SITE:
+            return httpx.Response(404)
+        headers, body = SITE[request.url.path]
+        if headers.get('etag') and request.headers.get('if-none-match') == headers['etag']:
+            return httpx.Response(304, headers={'etag': headers['etag']})
+        return httpx.Response(200, headers=headers, text=body)
+
+    return httpx.MockTransport(handler)
+
+
+def crawl(limit: int, known_pages: dict = None, requested: list[str] = None) -> list[dict]:
+    crawler = WebsiteCrawler(max_concurrency=1, host_delay=0, transport=serve(requested if requested is not None else []))
+
+    async def collect():
+        return [page async for page in crawler.crawl(ORIGIN, limit=limit, known_pages=known_pages)]
+
+    return asyncio.run(collect())
+
+
+def test_crawl_follows_sitemap_by_priority():
+    pages = crawl(limit=3)
+    assert [page['url'] for page in pages] == [ORIGIN, f'{ORIGIN}/about', f'{ORIGIN}/pricing']
+    assert '# About us' in pages[1]['markdown']
+
+
+def test_crawl_respects_robots():
+    requested = []
+    pages = crawl(limit=10, requested=requested)
+    urls = {page['url'] for page in pages}
+    assert f'{ORIGIN}/blog/launch' in urls
+    assert not any(path.startswith('/private') for path in requested)
+
+
+def test_crawl_reuses_unchanged_known_pages():
+    requested = []
+    known_pages = {ORIGIN: {'markdown': '# Cached home', 'etag': '"home-v1"', 'last_modified': None}}
+    pages = crawl(limit=1, known_pages=known_pages, requested=requested)
+    assert pages == [{
+        'url': ORIGIN,
+        'markdown': '# Cached home',
+        'etag': '"home-v1"',
+        'last_modified': None,
+        'not_modified': True
+    }]
+    # The sitemap is only read on the first crawl
+    assert '/sitemap.xml' not in requested
+
+
+def test_html_to_markdown_keeps_bare_links():
+    markdown = html_to_markdown(
+        '<html><body><div><a href="/blog">blog</a> and <span><a href="/team">team</a></span></div></body></html>',
+        ORIGIN
+    )
+    assert markdown == f'[blog]({ORIGIN}/blog) and [team]({ORIGIN}/team)'
@@ -1,19 +1,13 @@
-from openai import AsyncOpenAI
+from llm import complete
 
 
 async def get_gpt_summary(text: str) -> str:
     """Get summary from ChatGPT."""
     try:
         prompt = f"Explain this to me in details in markdown format by always keeping your answer objective and concise and by assuming I'm a VC who doesn't know anything about tech (Always try to comment on how it could be a pro or a con in the context of a future investment): {text}"
-        client = AsyncOpenAI()
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        return response.choices[0].message.content
+        return await complete([
+            {"role": "user", "content": prompt}
+        ])
     except Exception as e:
         print(f"Error calling ChatGPT API: {str(e)}")
         return f"Failed to generate summary: {str(e)}"
@@ -1,26 +1,36 @@
 import asyncio
 
 import json
+import logging
 import re
 import asyncio
 from urllib.parse import urlparse
 
-from openai import AsyncOpenAI
-
+from providers.github.utils import login_from_url
 from providers.harmonic import HarmonicClient
 from services.code_analyzer import CodeQualityAnalyzer
 from services.github_analyzer import GitHubAnalyzer
 from services.website_analyzer import WebsiteAnalyzer
-from cache import memorize
+from cache import cache, memorize
+from llm import complete
+from prompt_builder import PromptBuilder, compact_json, estimate_tokens
 from qualitative.founders import qualify_founder
+from quantitative.peer_index import company_cohorts, get_peer_index
+from quantitative.peer_scoring import PeerScorer
 from quantitative.techs import get_all_techs_with_trends, get_techs
 from qualitative.short_tech_summary import generate_company_tech_summary
+
+logger = logging.getLogger(__name__)
+
+
 class WebsiteAnalysisWorkflow:
     gh_report: str | None = None
     code_report: str | None = None
     employees_experience: list[dict] | None = None
     technologies: list[dict] | None = None
     founders_report: str | None = None
+    gh_users_report: str | None = None
+    website_analyzer: WebsiteAnalyzer | None = None
 
     def __init__(self, input_string: str):
         self.domain = self._extract_domain(input_string)
@@ -59,8 +69,23 @@ class WebsiteAnalysisWorkflow:
         company = await harmonic_client.find_company(self.domain)
         competitors = await harmonic_client.get_competitors(self.domain)
         md_competitors = harmonic_client.format_companies_to_md(competitors)
-        outliers_good, importance_good = harmonic_client.find_outliers(company, competitors, 0.2)
-        outliers_bad, importance_bad = harmonic_client.find_outliers(company, competitors, 0.5)
+        # One fit, the two thresholds are derived from the same anomaly scores
+        scorer = PeerScorer([company] + competitors)
+        outliers_good = scorer.outliers(0.2)
+        outliers_bad = scorer.outliers(0.5)
+        importance_good = importance_bad = scorer.feature_importance()
+
+        # Benchmark against every company indexed so far, within the largest industry cohort when there is one
+        peer_index = get_peer_index()
+        peer_index.add([company] + competitors)
+        industry_cohorts = [c for c in company_cohorts(company) if c.startswith('INDUSTRY:')]
+        cohort = max(industry_cohorts, key=peer_index.size, default=None)
+        if cohort and peer_index.size(cohort) < 5:
+            cohort = None
+        cohort_label = cohort.split(':', 1)[1] if cohort else 'all analyzed companies'
+        peer_benchmark_md = f"Compared with {peer_index.size(cohort)} companies ({cohort_label}):\n"
+        for metric, value in peer_index.percentiles(company, cohort).items():
+            peer_benchmark_md += f"- **{metric.replace('_', ' ').title()}**: {value:g}th percentile\n"
 
         # Calculate performance based on whether the company is in outliers
         performance = -1  # Default performance
@@ -89,6 +114,7 @@ class WebsiteAnalysisWorkflow:
             "overperformers": [company["name"] for company in outliers_good],
             "performance_comment": performance_comment,
             "importance_metrics": importance_md,
+            "peer_benchmark": peer_benchmark_md,
             "_performance": performance,
             "calculation_explanation": """The competitor analysis is performed using multiple data points and sophisticated algorithms:
 
@@ -116,10 +142,31 @@ class WebsiteAnalysisWorkflow:
         }
         return step_data
 
-    @memorize()
+    async def get_founder_github_logins(self) -> list[str]:
+        """GitHub logins found in the founders' Harmonic socials."""
+        try:
+            harmonic_client = HarmonicClient()
+            company = await harmonic_client.find_company(self.domain)
+            founders = await harmonic_client.get_founders_from_company(company)
+        except Exception as e:
+            logger.warning(f"Failed to find the founders of {self.domain}: {e}")
+            return []
+        return [
+            login for founder in founders
+            if (login := login_from_url(((founder.get('socials') or {}).get('GITHUB') or {}).get('url')))
+        ]
+
     async def generate_github_report(self) -> dict:
-        await self.gh_analyzer.run_analysis()
-        self.gh_report = self.gh_analyzer.report
+        step_data = await self._generate_github_report()
+        # Also set on a cache hit, for the memo
+        self.gh_report = step_data["Metrics"]
+        self.gh_users_report = step_data.get("Developer Profiles")
+        return step_data
+
+    @memorize()
+    async def _generate_github_report(self) -> dict:
+        founder_logins = await self.get_founder_github_logins()
+        await self.gh_analyzer.run_analysis(extra_logins=founder_logins)
         performance = self.gh_analyzer.color
         report = self.gh_analyzer.report
 
@@ -143,6 +190,8 @@ class WebsiteAnalysisWorkflow:
 5. **Issue Resolution Time**: Measures **responsiveness** to bugs and requests.  
 """
         }
+        if self.gh_analyzer.users_report:
+            step_data["Developer Profiles"] = self.gh_analyzer.users_report
         return step_data
 
     @memorize()
@@ -153,7 +202,7 @@ class WebsiteAnalysisWorkflow:
                 performance = -1
             else:
                 analyzer = CodeQualityAnalyzer(self.gh_analyzer.owner, self.gh_analyzer.repo)
-                await asyncio.to_thread(analyzer.run_analysis)
+                await analyzer.run_analysis()
                 self.code_report = analyzer.report
                 performance = analyzer.color
                 report = analyzer.report
@@ -188,10 +237,7 @@ class WebsiteAnalysisWorkflow:
             harmonic_client = HarmonicClient()
             company = await harmonic_client.find_company(self.domain)
             founders = await harmonic_client.get_founders_from_company(company)
-            founders_backgrounds = []
-            for founder in founders:
-                founder_background = qualify_founder(company, founder)
-                founders_backgrounds.append(founder_background)
+            founders_backgrounds = await asyncio.gather(*(qualify_founder(company, founder) for founder in founders))
             founders_md = harmonic_client.format_founders_to_md(founders, founders_backgrounds)
 
             # Calculate performance based on founders' sentiments
@@ -269,13 +315,26 @@ class WebsiteAnalysisWorkflow:
                 "calculation_explanation": str(e)
             }
             
+    async def get_website_analyzer(self) -> WebsiteAnalyzer:
+        """Crawls the website once and shares the crawl between the steps."""
+        if self.website_analyzer is None:
+            analyzer = WebsiteAnalyzer('https://' + self.domain)
+            async for page in analyzer.iter_pages():
+                logger.info("Crawled %s", page['url'])
+            self.website_analyzer = analyzer
+        return self.website_analyzer
+
     @memorize()
     async def generate_tech_summary_report(self) -> dict:
         harmonic_client = HarmonicClient()
-        analyzer = WebsiteAnalyzer('https://' + self.domain)
-        await analyzer.crawl()
-        techs = await get_techs(self.domain)
-        summary = generate_company_tech_summary(company= await harmonic_client.find_company(self.domain), webpages=analyzer._webpages, domain=self.domain, main_techs=techs.get('main_techs'), specific_techs=techs.get('specific_techs'))
+        analyzer = await self.get_website_analyzer()
+        # The summary is derived from the website content, reuse it while the content is unchanged
+        cache_key = f"tech_summary:{analyzer.fingerprint}"
+        summary = cache.get(cache_key)
+        if summary is None:
+            techs = await get_techs(self.domain)
+            summary = await generate_company_tech_summary(company= await harmonic_client.find_company(self.domain), webpages=analyzer._webpages, domain=self.domain, main_techs=techs.get('main_techs'), specific_techs=techs.get('specific_techs'))
+            cache.set(cache_key, summary, expire=analyzer.store.ttl)
         return {
             "step": 0,
             "_title": "Tech Summary",
@@ -347,12 +406,28 @@ class WebsiteAnalysisWorkflow:
 
     async def analyze_website(self):
         print('Analyzing website...')
-        analyzer = WebsiteAnalyzer('https://' + self.domain)
-        await analyzer.crawl()
+        analyzer = await self.get_website_analyzer()
         print('Crawled website')
         self.technologies = await analyzer.extract_technologies()
         print('Extracted technologies')
 
+    @staticmethod
+    def _summarize_person(person: dict) -> dict:
+        """Keeps the fields of a person profile that matter for the memo."""
+        return {
+            "name": person.get('full_name'),
+            "location": (person.get('location') or {}).get('location'),
+            "experience": [
+                f"{exp.get('title')} at {exp.get('company_name')}"
+                for exp in (person.get('experience') or [])[:5] if exp.get('company_name')
+            ],
+            "education": [
+                ' - '.join(filter(None, [(edu.get('school') or {}).get('name'), edu.get('degree'), edu.get('field')]))
+                for edu in (person.get('education') or [])[:3]
+            ],
+            "highlights": [h.get('text') for h in (person.get('highlights') or [])[:3]],
+        }
+
     @memorize()
     async def generate_memo(self):
         print('Generating memo...')
@@ -416,34 +491,26 @@ Make sure to use **clear, non-technical language** suitable for VC associates wh
 - The memo should be formatted in .md format with headers, bullet points, and concise paragraphs for readability.
 - Each section should be no longer than 1-2 paragraphs to maintain brevity and clarity.
             """
-            prompt += f"\n\n"
+            builder = PromptBuilder()
+            builder.add_text(prompt, priority=10, min_tokens=estimate_tokens(prompt))
             if self.technologies:
-                # TODO: Improve formatting
-                fmt_technologies = json.dumps(self.technologies, indent=2, default=str)
-                prompt += f"### Technologies Used:\n{fmt_technologies}\n\n"
+                builder.add_items(self.technologies, title="Technologies Used", priority=3, budget=2000)
             if self.gh_report:
-                prompt += f"### GitHub Report:\n{self.gh_report}\n\n"
+                builder.add_text(self.gh_report, title="GitHub Report", priority=5, budget=1000)
             if self.code_report:
-                prompt += f"### GitHub User Data:\n{self.code_report}\n\n"
+                builder.add_text(self.code_report, title="GitHub User Data", priority=4, budget=2000)
+            if self.gh_users_report:
+                builder.add_text(self.gh_users_report, title="GitHub Profiles", priority=4, budget=1500)
             if self.employees_experience:
-                # TODO: Improve formatting
-                fmt_employees_experience = json.dumps(self.employees_experience, indent=2, default=str)
-                prompt += f"### Employees Data:\n{fmt_employees_experience}\n\n"
+                # Employees are the bulkiest section, they are summarized and dropped first
+                employees = [self._summarize_person(person) for person in self.employees_experience]
+                builder.add_items(employees, title="Employees Data", priority=1, item_budget=300)
             # add step 4 data
             if self.founders_report:
-                prompt += f"### Founders Data:\n{self.founders_report}\n\n"
-            return prompt
-
-        openai_client = AsyncOpenAI()
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": build_prompt()}],
-            stream=True
-        )
-        response_text = ''
-        async for chunk in response:
-            if chunk.choices[0].delta.content:
-                response_text += chunk.choices[0].delta.content
+                builder.add_text(compact_json(self.founders_report), title="Founders Data", priority=6, budget=6000)
+            return builder.build()
+
+        response_text = await complete([{"role": "user", "content": build_prompt()}])
         print('Generated memo')
         
         return {